@@ -0,0 +1,78 @@
+"""
+Бенчмарк коммитов: `git add` + `git commit` на каждый коммит против долгоживущего fast-import (tests.git_writer).
+
+Создает временный репозиторий и делает в нем N коммитов, каждый раз меняя один файл.
+
+Запуск из корня репозитория:
+    python -m tests.bench_git
+    python -m tests.bench_git --commits 200
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+
+from tests.git_writer import GitWriter
+
+
+def init_repo(path):
+    subprocess.run(['git', 'init', '-q', path], check=True)
+    for key, value in (('user.name', 'bench'), ('user.email', 'bench@example.com')):
+        subprocess.run(['git', 'config', key, value], cwd=path, check=True)
+    with open(os.path.join(path, 'Задание 1.md'), 'w') as f:
+        f.write('0\n')
+    subprocess.run(['git', 'add', '.'], cwd=path, check=True)
+    subprocess.run(['git', 'commit', '-q', '-m', 'init'], cwd=path, check=True)
+
+
+def bench_subprocess(path, commits):
+    file_path = os.path.join(path, 'Задание 1.md')
+    started = time.perf_counter()
+    for i in range(commits):
+        with open(file_path, 'w') as f:
+            f.write(f'subprocess {i}\n')
+        subprocess.run(['git', 'add', 'Задание 1.md'], cwd=path, capture_output=True, check=True)
+        subprocess.run(['git', 'commit', '-m', f'commit {i}'], cwd=path, capture_output=True, check=True)
+    return (time.perf_counter() - started) * 1000 / commits
+
+
+def bench_writer(path, commits):
+    file_path = os.path.join(path, 'Задание 1.md')
+    writer = GitWriter(path)
+    writer.start()
+    started = time.perf_counter()
+    for i in range(commits):
+        with open(file_path, 'w') as f:
+            f.write(f'writer {i}\n')
+        ok, msg = writer.commit(f'commit {i}', [file_path])
+        if not ok:
+            raise RuntimeError(msg)
+    elapsed = (time.perf_counter() - started) * 1000 / commits
+    writer.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Стоимость одного коммита')
+    parser.add_argument('--commits', type=int, default=50)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix='ege_git_bench_')
+    try:
+        init_repo(tmp_dir)
+        sub_ms = bench_subprocess(tmp_dir, args.commits)
+        writer_ms = bench_writer(tmp_dir, args.commits)
+        status = subprocess.run(['git', 'status', '--porcelain'], cwd=tmp_dir, capture_output=True, text=True).stdout
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    print(f"git add + git commit: {sub_ms:.1f} мс на коммит")
+    print(f"fast-import:          {writer_ms:.1f} мс на коммит")
+    if status.strip():
+        print(f"ВНИМАНИЕ: рабочая копия не совпадает с индексом после коммитов:\n{status}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+"""
+Бенчмарк обработчика проверки на больших базах результатов.
+
+Для каждого размера (по умолчанию 1k, 10k, 100k и 1M попыток) генерируется синтетическая
+result.db во временной папке: 27 типов заданий, по --tasks заданий каждого типа, даты
+за последние --days дней. Затем --repeat раз выполняется проверка нового задания и
+перерисовка графиков, как ее делает фоновый обработчик (PNG сохраняется в память);
+перед замерами выполняется одна неучитываемая проверка.
+Git и запуск обработчика заменены заглушками, очередь переименований — во временной папке,
+поэтому рабочая копия не меняется.
+
+Этапы (медиана по повторам, секунды):
+    add_result, result_register (весь синхронный вызов, включая add_result),
+    common.collect, common.build (show_common_progress), common.savefig,
+    detailed.collect, detailed.build (show_detailed_progress_table), detailed.savefig,
+    end_to_end (result_register и перерисовка обоих графиков).
+
+С --output результаты пишутся в JSON (коммит, версия Python, этапы по размерам) для
+отслеживания кривых масштабирования между коммитами.
+
+Запуск из корня репозитория:
+    python -m tests.bench_harness
+    python -m tests.bench_harness --sizes 1000 100000 --repeat 3 --output harness.json
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from tests import conftest, rename_worker, storage
+from tests.bench_solutions import current_commit
+
+STAGES = ['add_result', 'result_register',
+          'common.collect', 'common.build', 'common.savefig',
+          'detailed.collect', 'detailed.build', 'detailed.savefig',
+          'end_to_end']
+TASK_TYPES = 27
+
+
+def generate_db(attempts, tasks_per_type, days, seed=0):
+    """Заполняет текущую БД (EGE_RESULT_DB) синтетическими попытками. Возвращает время генерации."""
+    rnd = random.Random(seed)
+    now = datetime.now()
+    started = time.perf_counter()
+
+    def rows():
+        for _ in range(attempts):
+            date_time = now - timedelta(days=rnd.randrange(days), seconds=rnd.randrange(86400))
+            yield (date_time.isoformat(), rnd.randint(1, tasks_per_type), rnd.randint(1, TASK_TYPES),
+                   1 if rnd.random() < 0.6 else 0)
+
+    # Напрямую в test и одним пересчетом сводных таблиц: add_results для миллиона строк слишком долог
+    with storage.transaction() as connection:
+        connection.executemany('INSERT INTO test (date_time, task_number, task_type, result) VALUES (?, ?, ?, ?)',
+                               rows())
+        storage.rebuild_progress_tables(connection)
+    return time.perf_counter() - started
+
+
+def grade_once(number, timings):
+    """Одна проверка нового (еще не решенного) задания и перерисовка графиков; этапы — в timings."""
+    started = time.perf_counter()
+    conftest.result_register(number % TASK_TYPES + 1, number, 'ответ', 'не тот хэш')
+    timings['result_register'].append(time.perf_counter() - started)
+
+    for name, collect, show in (('common', conftest.collect_common_progress, conftest.show_common_progress),
+                                ('detailed', conftest.collect_detailed_progress,
+                                 conftest.show_detailed_progress_table)):
+        t0 = time.perf_counter()
+        data = collect()
+        t1 = time.perf_counter()
+        fig = show(data)
+        t2 = time.perf_counter()
+        fig.savefig(io.BytesIO(), format='png')
+        t3 = time.perf_counter()
+        fig.clear()
+        timings[f'{name}.collect'].append(t1 - t0)
+        timings[f'{name}.build'].append(t2 - t1)
+        timings[f'{name}.savefig'].append(t3 - t2)
+    timings['end_to_end'].append(time.perf_counter() - started)
+
+
+def bench_size(attempts, args, tmp_dir):
+    os.environ['EGE_RESULT_DB'] = os.path.join(tmp_dir, f'result_{attempts}.db')
+    storage.close_connection()
+    try:
+        generate_seconds = generate_db(attempts, args.tasks, args.days)
+        timings = {name: [] for name in STAGES}
+
+        def timed_add_result(*a):
+            t0 = time.perf_counter()
+            try:
+                return storage.add_result(*a)
+            finally:
+                timings['add_result'].append(time.perf_counter() - t0)
+
+        conftest.add_result = timed_add_result
+        try:
+            # Номера заданий вне синтетического диапазона: каждая проверка — новая запись, а не пропуск.
+            # Первая проверка не учитывается: в ней импорт matplotlib, загрузка шрифтов и чтение БД с диска
+            grade_once(args.tasks + 1, {name: [] for name in STAGES})
+            for i in range(args.repeat):
+                grade_once(args.tasks + 2 + i, timings)
+        finally:
+            conftest.add_result = storage.add_result
+    finally:
+        # При закрытии WAL переносится в основной файл, и размер файла становится размером БД
+        storage.close_connection()
+    db_mb = os.path.getsize(os.environ['EGE_RESULT_DB']) / (1024 * 1024)
+    return {'attempts': attempts, 'db_mb': db_mb, 'generate_seconds': generate_seconds,
+            'stages': {name: statistics.median(values) for name, values in timings.items()}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарк result_register на больших базах результатов')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000, 1000000])
+    parser.add_argument('--repeat', type=int, default=5, help='проверок на каждом размере')
+    parser.add_argument('--tasks', type=int, default=200, help='заданий каждого типа')
+    parser.add_argument('--days', type=int, default=730, help='за сколько дней распределены попытки')
+    parser.add_argument('--output', help='записать результаты в JSON-файл')
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix='ege_harness_')
+    # Заглушки: без коммитов, без фонового процесса, очередь переименований — во временной папке
+    conftest.wake_worker = lambda: None
+    conftest.commit_paths = lambda *a, **kw: (True, "Коммит пропущен (бенчмарк)")
+    rename_worker.DB_PATH = os.path.join(tmp_dir, 'rename_queue.db')
+
+    results = {'commit': current_commit(), 'created': datetime.now().isoformat(timespec='seconds'),
+               'python': f"{platform.python_implementation()} {platform.python_version()}",
+               'platform': platform.platform(), 'repeat': args.repeat, 'tasks': args.tasks,
+               'days': args.days, 'sizes': []}
+    try:
+        for attempts in args.sizes:
+            result = bench_size(attempts, args, tmp_dir)
+            results['sizes'].append(result)
+            print(f"{attempts:>9} попыток: БД {result['db_mb']:.1f} МБ, генерация {result['generate_seconds']:.1f} с, "
+                  f"end_to_end {result['stages']['end_to_end'] * 1000:.0f} мс", flush=True)
+    finally:
+        os.environ.pop('EGE_RESULT_DB', None)
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    print()
+    print(f"{'этап, мс':<18}" + ''.join(f"{r['attempts']:>11}" for r in results['sizes']))
+    for name in STAGES:
+        print(f"{name:<18}" + ''.join(f"{r['stages'][name] * 1000:>11.1f}" for r in results['sizes']))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=1)
+        print(f"Результаты записаны в {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
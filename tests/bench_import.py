@@ -0,0 +1,81 @@
+"""
+Бенчмарк времени запуска: сколько стоит `from tests.conftest import result_register` в скрипте задания.
+
+Импорт замеряется в новом интерпретаторе с `-X importtime` несколько раз, печатается медиана
+и самые тяжелые модули. Код возврата 1, если при импорте загрузились тяжелые библиотеки
+(numpy, matplotlib) или медиана превысила бюджет — так регрессию видно сразу.
+
+Запуск из корня репозитория:
+    python -m tests.bench_import
+    python -m tests.bench_import --runs 20 --budget-ms 100
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+from tests.storage import repo_root
+
+MODULE = 'tests.conftest'
+# Модули, которые не должны загружаться при импорте tests.conftest
+FORBIDDEN = ('numpy', 'matplotlib')
+
+
+def measure_import(module=MODULE):
+    """
+    Импортирует module в отдельном интерпретаторе с -X importtime.
+    Возвращает (накопленное время импорта module в мс, {модуль: собственное время в мкс}).
+    """
+    env = dict(os.environ, PYTHONPATH=repo_root())
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=repo_root(), env=env, capture_output=True, text=True, check=True
+    )
+    total_ms = None
+    self_times = {}
+    for line in result.stderr.splitlines():
+        # Формат: "import time:      self [us] | cumulative | imported package"
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        name = name.strip()
+        self_times[name] = int(self_us)
+        if name == module:
+            total_ms = int(cumulative_us) / 1000
+    return total_ms, self_times
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Время импорта tests.conftest')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--budget-ms', type=float, default=150.0)
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    totals = []
+    self_times = {}
+    for _ in range(args.runs):
+        total_ms, self_times = measure_import()
+        totals.append(total_ms)
+
+    median = statistics.median(totals)
+    print(f"Импорт {MODULE}: медиана {median:.1f} мс, мин {min(totals):.1f} мс, макс {max(totals):.1f} мс "
+          f"({args.runs} запусков)")
+    print("Самые тяжелые модули (последний запуск):")
+    for name, us in sorted(self_times.items(), key=lambda x: -x[1])[:args.top]:
+        print(f"  {us / 1000:8.2f} мс  {name}")
+
+    ok = True
+    loaded = sorted(name for name in self_times if name.split('.')[0] in FORBIDDEN)
+    if loaded:
+        ok = False
+        print(f"ОШИБКА: при импорте загружаются тяжелые модули: {', '.join(loaded[:5])}")
+    if median > args.budget_ms:
+        ok = False
+        print(f"ОШИБКА: медиана {median:.1f} мс превышает бюджет {args.budget_ms:.0f} мс")
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
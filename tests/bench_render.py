@@ -0,0 +1,209 @@
+"""
+Бенчмарк отрисовки детальной таблицы прогресса.
+
+Строит таблицу для синтетических данных с разным числом попыток прежним способом (отдельные
+Rectangle и ax.text на каждую попытку) и текущим (коллекции), сохраняет PNG в память и печатает
+время построения, время savefig и число artist'ов на осях.
+
+Запуск из корня репозитория:
+    python -m tests.bench_render
+    python -m tests.bench_render --sizes 1000 10000 --days 30
+"""
+import argparse
+import io
+import random
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib import pyplot as plt
+
+from tests.conftest import OLDER_BAND, show_detailed_progress_table
+
+
+def legacy_show_detailed_progress_table(progress):
+    # Прежняя реализация: Rectangle и ax.text на каждую попытку, axhline/axvline на каждую линию сетки
+    import numpy as np
+    from matplotlib import pyplot as plt
+    import matplotlib.patches as mpatches
+
+    if not progress:
+        fig, ax = plt.subplots(figsize=(12, 5))
+        ax.text(0.5, 0.5, "Нет данных для отображения", ha='center', va='center', fontsize=14)
+        ax.set_axis_off()
+        return fig
+
+    # date -> task_type -> list[(task_number, result)]
+    date_type_task_result = {datetime.fromisoformat(day).date(): cells
+                             for day, cells in progress.items() if day != OLDER_BAND}
+
+    # Сортируем даты и типы заданий
+    sorted_dates = sorted(date_type_task_result, reverse=True)  # Последние даты сверху
+    # Строка «Ранее» — последней: в ее ячейках вместо номеров заданий количество верных и неверных попыток
+    if progress.get(OLDER_BAND):
+        date_type_task_result[OLDER_BAND] = progress[OLDER_BAND]
+        sorted_dates.append(OLDER_BAND)
+    sorted_types = sorted({t for cells in progress.values() for t in cells})  # Типы заданий по порядку
+
+    # Создаем фигуру и оси
+    # Мы не можем заранее знать высоту, поэтому сначала рассчитаем необходимые высоты строк
+    
+    # 1. Рассчитываем максимальное количество заданий в ячейке для каждой даты (строки)
+    max_tasks_per_date = []
+    for day in sorted_dates:
+        max_t = 0
+        for task_type in sorted_types:
+            tasks = date_type_task_result[day].get(task_type, [])
+            if len(tasks) > max_t:
+                max_t = len(tasks)
+        max_tasks_per_date.append(max(1, max_t)) # Минимум 1 слот высоты
+        
+    # Параметры отрисовки
+    row_padding = 0.1  # Отступ между строками
+    task_height = 0.34  # Высота одного блока задания
+    task_gap = 0.06    # Зазор между блоками заданий
+    
+    # Рассчитываем координаты Y для каждой строки
+    # y=0 будет вверху. Идем вниз.
+    row_y_starts = []
+    current_y = 0
+    for count in max_tasks_per_date:
+        row_height = count * task_height + row_padding
+        row_y_starts.append((current_y, row_height))
+        current_y -= row_height
+        
+    total_plot_height = abs(current_y)
+    
+    # Создаем фигуру с адаптивной высотой
+    fig, ax = plt.subplots(figsize=(15, max(4, total_plot_height * 0.5)))
+    
+    # Настраиваем пределы осей
+    ax.set_xlim(-0.5, len(sorted_types) - 0.5)
+    ax.set_ylim(current_y, 0)
+    
+    # Рисуем сетку и данные
+    for i, day in enumerate(sorted_dates):
+        y_start, h = row_y_starts[i]
+        y_center = y_start - h / 2
+        
+        # Горизонтальная линия разделителя (нижняя граница строки)
+        ax.axhline(y_start - h, color='lightgray', linewidth=1)
+        
+        # Подпись даты слева
+        label = "Ранее\n(попыток)" if day == OLDER_BAND else day.strftime('%d.%m.%Y')
+        ax.text(-0.6, y_center, label, 
+                ha='right', va='center', fontsize=9, fontweight='bold')
+        
+        # Рисуем данные по столбцам
+        for j, task_type in enumerate(sorted_types):
+            if task_type in date_type_task_result[day]:
+                sorted_tasks = date_type_task_result[day][task_type]
+                
+                num_tasks = len(sorted_tasks)
+                if num_tasks > 0:
+                    # Рисуем блоки заданий
+                    # Блоки занимают всю доступную ширину ячейки (1.0 минус отступы)
+                    cell_width = 1.0
+                    block_width = cell_width - 0.1 # Небольшой отступ по бокам
+                    
+                    # Начальный Y для первого блока в этой ячейке
+                    # Отступ сверху внутри ячейки
+                    cell_top = y_start - row_padding / 2
+                    
+                    for k, (task_num, res) in enumerate(sorted_tasks):
+                        color = '#ccffcc' if res == 1 else '#ffcccc'
+                        
+                        # Границы слота
+                        slot_bottom = cell_top - (k + 1) * task_height
+                        
+                        # Вычисляем высоту блока с учетом зазора
+                        block_h = task_height - task_gap
+                        # Центрируем блок в слоте (или сдвигаем, чтобы зазор был между блоками)
+                        # Зазор разделим пополам сверху и снизу
+                        block_y = slot_bottom + task_gap / 2
+                        
+                        # Рисуем прямоугольник
+                        rect = mpatches.Rectangle(
+                            (j - block_width/2, block_y), 
+                            block_width, block_h,
+                            facecolor=color, edgecolor='gray', linewidth=0.5
+                        )
+                        ax.add_patch(rect)
+                        
+                        # Текст (по центру блока)
+                        symbol = "+" if res == 1 else "−"
+                        txt = f"{symbol}{task_num}"
+                        
+                        # Текст выравниваем по центру вычисленного блока
+                        text_x = j
+                        text_y = block_y + block_h / 2
+                        
+                        ax.text(text_x, text_y, txt, 
+                                ha='center', va='center', fontsize=8)
+
+    # Вертикальные линии сетки
+    for j in range(len(sorted_types) + 1):
+        ax.axvline(j - 0.5, color='lightgray', linewidth=1)
+
+    # Настраиваем оси X
+    ax.set_xticks(np.arange(len(sorted_types)))
+    ax.set_xticklabels([f"{t}" for t in sorted_types])
+    ax.xaxis.set_tick_params(top=True, bottom=False, labeltop=True, labelbottom=False)
+    
+    # Убираем стандартные оси Y, так как мы их нарисовали вручную
+    ax.set_yticks([])
+    ax.spines['left'].set_visible(False)
+    ax.spines['right'].set_visible(False)
+    ax.spines['bottom'].set_visible(False)
+    
+    # Добавляем заголовок и легенду
+    ax.set_title("Детальный прогресс по заданиям", pad=20)
+
+    # Настраиваем размер фигуры и отступы
+    plt.tight_layout()
+
+    return fig
+
+
+def synthetic_progress(attempts, days):
+    """Данные в формате collect_detailed_progress: attempts попыток, равномерно по days датам и 27 типам."""
+    rnd = random.Random(attempts)
+    start = date(2025, 9, 1)
+    progress = defaultdict(lambda: defaultdict(list))
+    for _ in range(attempts):
+        day = (start + timedelta(days=rnd.randrange(days))).isoformat()
+        progress[day][rnd.randint(1, 27)].append((rnd.randint(1, 500), 1 if rnd.random() < 0.4 else 0))
+    return progress
+
+
+def measure(show, progress):
+    """Возвращает (построение, с; savefig, с; artist'ов на осях)."""
+    started = time.perf_counter()
+    fig = show(progress)
+    built = time.perf_counter()
+    fig.savefig(io.BytesIO(), format='png')
+    saved = time.perf_counter()
+    artists = len(fig.axes[0].get_children())
+    plt.close(fig)
+    return built - started, saved - built, artists
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Время отрисовки детальной таблицы прогресса')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 50_000])
+    parser.add_argument('--days', type=int, default=60, help='число дат в синтетических данных')
+    args = parser.parse_args()
+
+    print(f"{'попыток':>8} | {'способ':<10} | {'построение, с':>13} | {'savefig, с':>10} | {'итого, с':>8} | {'artist':>7}")
+    for attempts in args.sizes:
+        progress = synthetic_progress(attempts, args.days)
+        for name, show in (('прежний', legacy_show_detailed_progress_table),
+                           ('коллекции', show_detailed_progress_table)):
+            build_s, save_s, artists = measure(show, progress)
+            print(f"{attempts:>8} | {name:<10} | {build_s:>13.2f} | {save_s:>10.2f} | {build_s + save_s:>8.2f} | {artists:>7}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,242 @@
+"""
+Бенчмарк решений: решенные скрипты заданий (`+Задание N.py`) и примеры тем (`пример*.py`).
+
+Каждый скрипт выполняется --repeat раз подряд в отдельном процессе (tests/task_runner.py):
+turtle заменен заглушкой, графики matplotlib не показываются, result_register ничего не записывает.
+Для скрипта сохраняются медиана и минимум времени выполнения (без запуска интерпретатора),
+медиана процессорного времени и наибольший пиковый RSS процесса. Скрипты запускаются
+по одному, чтобы параллельные процессы не искажали замеры.
+
+Результаты пишутся в tests/bench_results/<коммит>.json (замеры зависят от машины, поэтому
+не коммитятся) и сравниваются с прошлыми прогонами: каждый скрипт — с последним прогоном
+другого коммита, где он выполнился без ошибки (или с прогоном --baseline). Код возврата 1, если время или память какого-то скрипта выросли больше
+порога (--threshold, доля) и больше шума (--min-seconds, --min-mb).
+
+Запуск из корня репозитория:
+    python -m tests.bench_solutions
+    python -m tests.bench_solutions --repeat 5 --threshold 0.2 --baseline 1a2b3c4
+    python -m tests.bench_solutions --filter "Тема 6" --no-save
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+from datetime import datetime
+
+from tests import catalog
+from tests.grader import DEFAULT_MEMORY_MB, run_child, runner_command, runner_env
+from tests.storage import repo_root
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'bench_results')
+EXAMPLE_RE = re.compile(r'^пример.*\.py$')
+
+
+def _rel(path):
+    return os.path.relpath(path, repo_root()).replace(os.sep, '/')
+
+
+def example_scripts():
+    """Примеры `пример*.py` из папок тем и их папок `Задания`."""
+    scripts = []
+    for _, task_dir in catalog.task_dirs():
+        for folder in (os.path.dirname(task_dir), task_dir):
+            scripts.extend(entry.path for entry in os.scandir(folder)
+                           if entry.is_file() and EXAMPLE_RE.match(entry.name))
+    return scripts
+
+
+def solved_scripts():
+    catalog.refresh()
+    return [task['script'] for task in catalog.get_tasks(status='+') if task['script']]
+
+
+def _matches(path, pattern):
+    """Путь содержит pattern целыми компонентами: "Тема 1" не выбирает "Тема 11"."""
+    parts = path.split('/')
+    wanted = pattern.strip('/').split('/')
+    return any(parts[i:i + len(wanted)] == wanted for i in range(len(parts) - len(wanted) + 1))
+
+
+def current_commit():
+    """
+    Короткий хэш HEAD, с суффиксом -dirty при незакоммиченных изменениях. tests/result.db не учитывается:
+    ее меняет любой запуск заданий, и иначе прогоны никогда не находили бы базу для сравнения.
+    """
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=repo_root(),
+                                capture_output=True, text=True, timeout=30)
+        status = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no', '--', '.',
+                                 ':(exclude)tests/result.db'],
+                                cwd=repo_root(), capture_output=True, text=True, timeout=30)
+    except (OSError, subprocess.TimeoutExpired):
+        return 'unknown'
+    commit = result.stdout.strip()
+    if not commit:
+        return 'unknown'
+    return f"{commit}-dirty" if status.stdout.strip() else commit
+
+
+def measure(script_path, repeat, timeout, memory_mb):
+    """
+    Выполняет скрипт repeat раз и возвращает сводку замеров. После ошибки или таймаута
+    повторы прекращаются, а в сводку попадает поле error.
+    """
+    command = runner_command(script_path, memory_mb, stub_turtle=True)
+    env = runner_env()
+    seconds, cpu, rss = [], [], []
+    error = None
+    for _ in range(repeat):
+        returncode, stdout, stderr, peak_rss_mb, cpu_seconds = run_child(
+            command, os.path.dirname(script_path), env, timeout)
+        if returncode is None:
+            error = f"Превышено время ({timeout:.0f} с)"
+            break
+        try:
+            report = json.loads(stdout.strip().splitlines()[-1])
+        except (IndexError, ValueError):
+            stderr_lines = stderr.strip().splitlines()
+            error = stderr_lines[-1] if stderr_lines else f"код возврата {returncode}"
+            break
+        if report['error']:
+            error = report['error']
+            break
+        seconds.append(report['seconds'])
+        if cpu_seconds is not None:
+            cpu.append(cpu_seconds)
+        if peak_rss_mb is not None:
+            rss.append(peak_rss_mb)
+
+    result = {'runs': len(seconds), 'error': error}
+    if seconds:
+        result.update(seconds=statistics.median(seconds), seconds_min=min(seconds),
+                      cpu_seconds=statistics.median(cpu) if cpu else None,
+                      peak_rss_mb=max(rss) if rss else None)
+    return result
+
+
+def results_path(commit):
+    return os.path.join(RESULTS_DIR, f"{commit}.json")
+
+
+def save_results(results):
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = results_path(results['commit'])
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=1)
+    return path
+
+
+def load_baselines(baseline, commit):
+    """
+    Возвращает сохраненные прогоны для сравнения, от новых к старым.
+    baseline — коммит или путь к JSON; без него берутся все прогоны других коммитов.
+    """
+    if baseline:
+        path = baseline if os.path.isfile(baseline) else results_path(baseline)
+        try:
+            with open(path, encoding='utf-8') as f:
+                return [json.load(f)]
+        except (OSError, ValueError) as e:
+            print(f"Не удалось прочитать базовые результаты {baseline}: {e}")
+            return []
+
+    runs = []
+    try:
+        names = os.listdir(RESULTS_DIR)
+    except OSError:
+        return []
+    for name in names:
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(RESULTS_DIR, name), encoding='utf-8') as f:
+                results = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if results.get('commit') != commit:
+            runs.append(results)
+    return sorted(runs, key=lambda r: r['created'], reverse=True)
+
+
+def find_regressions(current, baselines, threshold, min_seconds, min_mb):
+    """
+    Список (скрипт, коммит сравнения, метрика, было, стало) для замеров, выросших больше порога
+    и больше шума. Каждый скрипт сравнивается с последним прогоном, где он выполнился без ошибки.
+    """
+    regressions = []
+    for script, new in current['scripts'].items():
+        if new.get('error'):
+            continue
+        base = next((run for run in baselines
+                     if script in run['scripts'] and not run['scripts'][script].get('error')), None)
+        if base is None:
+            continue
+        old = base['scripts'][script]
+        for metric, noise in (('seconds', min_seconds), ('peak_rss_mb', min_mb)):
+            before, after = old.get(metric), new.get(metric)
+            if before is None or after is None:
+                continue
+            if after > before * (1 + threshold) and after - before > noise:
+                regressions.append((script, base['commit'], metric, before, after))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарк решенных заданий и примеров')
+    parser.add_argument('--repeat', type=int, default=3, help='сколько раз выполнить каждый скрипт')
+    parser.add_argument('--timeout', type=float, default=300.0, help='секунд на один запуск')
+    parser.add_argument('--memory-mb', type=float, default=DEFAULT_MEMORY_MB, help='лимит памяти, МБ')
+    parser.add_argument('--filter', help='только скрипты, в пути которых есть эта папка или файл (целиком)')
+    parser.add_argument('--baseline', help='коммит или JSON-файл для сравнения')
+    parser.add_argument('--threshold', type=float, default=0.25, help='допустимый рост, доля (0.25 = 25%%)')
+    parser.add_argument('--min-seconds', type=float, default=0.05, help='рост времени меньше этого — шум')
+    parser.add_argument('--min-mb', type=float, default=5.0, help='рост памяти меньше этого — шум')
+    parser.add_argument('--no-save', action='store_true', help='не сохранять результаты')
+    args = parser.parse_args()
+
+    scripts = sorted(set(solved_scripts() + example_scripts()))
+    if args.filter:
+        scripts = [s for s in scripts if _matches(_rel(s), args.filter)]
+    if not scripts:
+        print("Скрипты не найдены")
+        return 1
+
+    commit = current_commit()
+    results = {'commit': commit, 'created': datetime.now().isoformat(timespec='seconds'),
+               'python': f"{platform.python_implementation()} {platform.python_version()}",
+               'platform': platform.platform(), 'repeat': args.repeat, 'scripts': {}}
+    print(f"Коммит {commit}, скриптов: {len(scripts)}, повторов: {args.repeat}")
+    for script in scripts:
+        rel = _rel(script)
+        result = measure(script, args.repeat, args.timeout, args.memory_mb)
+        results['scripts'][rel] = result
+        if result['runs']:
+            rss = result['peak_rss_mb']
+            rss = f"{rss:7.1f}" if rss is not None else f"{'-':>7}"
+            print(f"  {result['seconds']:8.3f} с (мин. {result['seconds_min']:.3f})  {rss} МБ  {rel}", flush=True)
+        if result['error']:
+            print(f"  {'ошибка':>8}  {rel}: {result['error']}", flush=True)
+
+    if not args.no_save:
+        print(f"Результаты сохранены: {os.path.relpath(save_results(results), repo_root())}")
+
+    baselines = load_baselines(args.baseline, commit)
+    if not baselines:
+        print("Нет результатов для сравнения")
+        return 0
+    regressions = find_regressions(results, baselines, args.threshold, args.min_seconds, args.min_mb)
+    print(f"Сравнение с прошлыми прогонами (последний: {baselines[0]['commit']}, {baselines[0]['created']}): "
+          f"регрессий {len(regressions)}")
+    for script, base_commit, metric, before, after in regressions:
+        unit = 'с' if metric == 'seconds' else 'МБ'
+        print(f"  РЕГРЕССИЯ {script}: {before:.3f} → {after:.3f} {unit} ({after / before - 1:+.0%}) "
+              f"относительно {base_commit}")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""
+Микро-бенчмарк слоя хранения результатов.
+
+Сравнивает задержку одного вызова при прежнем подходе (новое соединение, CREATE TABLE и полный
+просмотр таблицы test на каждый вызов) и через tests.storage (одно соединение на процесс, WAL, индекс).
+
+Запуск из корня репозитория:
+    python -m tests.bench_storage
+    python -m tests.bench_storage --sizes 10000 100000 --calls 500
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from tests import storage
+
+
+def fill_legacy_db(path, rows):
+    """Создает БД в исходном формате (без индекса и сводных таблиц) с rows синтетическими попытками."""
+    rnd = random.Random(rows)
+    start = datetime(2024, 9, 1)
+    with sqlite3.connect(path) as connection:
+        connection.execute('CREATE TABLE test (date_time DATETIME, task_number BIGINT, task_type INTEGER, result INTEGER)')
+        connection.executemany(
+            'INSERT INTO test VALUES (?, ?, ?, ?)',
+            (((start + timedelta(minutes=i)).isoformat(), rnd.randint(1, 500), rnd.randint(1, 27), rnd.randint(0, 1))
+             for i in range(rows))
+        )
+
+
+def legacy_add_result(path, date_time, task_number, task_type, result):
+    # Повторяет прежнюю реализацию add_result
+    with sqlite3.connect(path) as connection:
+        cursor = connection.cursor()
+        cursor.execute('CREATE TABLE IF NOT EXISTS test (date_time DATETIME, task_number BIGINT, task_type INTEGER, result INTEGER)')
+        cursor.execute('SELECT 1 FROM test WHERE task_number = ? AND task_type = ? AND result = 1',
+                       (task_number, task_type))
+        if cursor.fetchone():
+            return
+        cursor.execute('INSERT INTO test (date_time, task_number, task_type, result) VALUES (?, ?, ?, ?)',
+                       (date_time, task_number, task_type, result))
+
+
+def legacy_get_result(path, task_number, task_type):
+    with sqlite3.connect(path) as connection:
+        cursor = connection.cursor()
+        cursor.execute('SELECT * FROM test WHERE task_number = ? AND task_type = ?', (task_number, task_type))
+        return cursor.fetchone()
+
+
+def per_call_ms(func, calls):
+    """Возвращает среднюю задержку одного вызова func(i) в миллисекундах."""
+    started = time.perf_counter()
+    for i in range(calls):
+        func(i)
+    return (time.perf_counter() - started) * 1000 / calls
+
+
+def bench_size(rows, calls):
+    tmp_dir = tempfile.mkdtemp(prefix='ege_bench_')
+    try:
+        legacy_path = os.path.join(tmp_dir, 'legacy.db')
+        fill_legacy_db(legacy_path, rows)
+        new_path = os.path.join(tmp_dir, 'result.db')
+        shutil.copyfile(legacy_path, new_path)
+        now = datetime.now().isoformat()
+
+        # Номера заданий за пределами синтетических данных: задание не решено, запись добавляется
+        legacy_add = per_call_ms(lambda i: legacy_add_result(legacy_path, now, 10 ** 6 + i, 5, 0), calls)
+        legacy_get = per_call_ms(lambda i: legacy_get_result(legacy_path, 10 ** 6 + i, 5), calls)
+
+        os.environ['EGE_RESULT_DB'] = new_path
+        storage.close_connection()
+        started = time.perf_counter()
+        storage.get_connection()  # первое открытие применяет миграции к БД старого формата
+        migrate_s = time.perf_counter() - started
+
+        new_add = per_call_ms(lambda i: storage.add_result(now, 10 ** 6 + i, 5, 0), calls)
+        new_get = per_call_ms(lambda i: storage.get_result(10 ** 6 + i, 5), calls)
+        storage.close_connection()
+    finally:
+        os.environ.pop('EGE_RESULT_DB', None)
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    return {
+        'rows': rows,
+        'migrate_s': migrate_s,
+        'legacy_add_ms': legacy_add,
+        'storage_add_ms': new_add,
+        'legacy_get_ms': legacy_get,
+        'storage_get_ms': new_get,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Задержка операций с result.db при разном объеме истории')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--calls', type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'строк':>9} | {'миграция, с':>11} | {'add_result, мс (было/стало)':>28} | {'get_result, мс (было/стало)':>28}")
+    for rows in args.sizes:
+        r = bench_size(rows, args.calls)
+        print(f"{r['rows']:>9} | {r['migrate_s']:>11.2f} | "
+              f"{r['legacy_add_ms']:>13.3f} / {r['storage_add_ms']:<12.3f} | "
+              f"{r['legacy_get_ms']:>13.3f} / {r['storage_get_ms']:<12.3f}")
+
+
+if __name__ == '__main__':
+    main()
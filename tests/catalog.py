@@ -0,0 +1,211 @@
+"""
+Каталог заданий рабочей тетради.
+
+Хранится в result.db (таблицы catalog_tasks и catalog_dirs): какие задания есть в папках
+`Тема N/Задания`, их статус (префикс '+'/'-' в имени), скрипт решения, вложения и хэш ответа
+из вызова result_register(...). refresh() пересканирует только папки, время изменения которых
+поменялось; запросы (get_tasks, find_task, get_scripts) к файловой системе не обращаются.
+
+Запуск из корня репозитория (обновить каталог и вывести сводку по темам):
+    python -m tests.catalog
+"""
+import json
+import os
+import re
+import sys
+
+from tests.storage import repo_root, get_connection, transaction, _connection_lock
+
+TOPIC_RE = re.compile(r'^Тема (\d+)$')
+# Профили решения (`Задание N.prof`, `Задание N.profile.txt`, см. tests/task_runner.py) — не вложения
+TASK_FILE_RE = re.compile(r'^([+-]?)Задание (\d+)(?!\.prof$|\.profile\.txt$)(\.[^.]+)$')
+COLUMNS = 'task_type, task_number, task_dir, status, script, attachments, answer_hash'
+REGISTER_RE = re.compile(
+    r"result_register\(\s*(\d+)\s*,\s*(\d+)\s*,[^,]*,\s*['\"]([0-9a-fA-F]{32})['\"]"
+)
+
+
+def _rel(path):
+    # В БД пути хранятся относительно корня репозитория и с прямыми слешами
+    return os.path.relpath(path, repo_root()).replace(os.sep, '/')
+
+
+def _abs(rel_path):
+    return os.path.join(repo_root(), *rel_path.split('/')) if rel_path else None
+
+
+def task_dirs():
+    """Папки `Тема N/Задания` (в корне и в `ЕГЭ/`) в виде списка (номер темы, путь)."""
+    result = []
+    for root in (repo_root(), os.path.join(repo_root(), 'ЕГЭ')):
+        try:
+            entries = list(os.scandir(root))
+        except OSError:
+            continue
+        for entry in entries:
+            match = TOPIC_RE.match(entry.name)
+            task_dir = os.path.join(entry.path, 'Задания')
+            if match and entry.is_dir() and os.path.isdir(task_dir):
+                result.append((int(match.group(1)), task_dir))
+    return sorted(result)
+
+
+def parse_register_call(script_path):
+    """Возвращает (task_type, number, хэш ответа) из вызова result_register в скрипте или None."""
+    try:
+        with open(script_path, encoding='utf-8', errors='replace') as f:
+            match = REGISTER_RE.search(f.read())
+    except OSError:
+        return None
+    if not match:
+        return None
+    return int(match.group(1)), int(match.group(2)), match.group(3).lower()
+
+
+def scan_tasks(topic, task_dir):
+    """Сканирует одну папку заданий и возвращает строки для catalog_tasks."""
+    # номер задания -> {'status', 'script', 'attachments'}
+    tasks = {}
+    with os.scandir(task_dir) as entries:
+        for entry in entries:
+            match = TASK_FILE_RE.match(entry.name)
+            if not match or not entry.is_file():
+                continue
+            prefix, number, ext = match.group(1), int(match.group(2)), match.group(3).lower()
+            task = tasks.setdefault(number, {'status': prefix, 'script': None, 'attachments': []})
+            if ext == '.py':
+                # Статус задания определяется по имени скрипта решения
+                task['status'] = prefix
+                task['script'] = entry.path
+            else:
+                task['attachments'].append(_rel(entry.path))
+
+    rows = []
+    for number, task in tasks.items():
+        task_type, task_number, answer_hash = topic, number, None
+        if task['script']:
+            parsed = parse_register_call(task['script'])
+            if parsed:
+                task_type, task_number, answer_hash = parsed
+        rows.append((task_type, task_number, _rel(task_dir), task['status'],
+                     _rel(task['script']) if task['script'] else None,
+                     json.dumps(sorted(task['attachments']), ensure_ascii=False), answer_hash, number))
+    return rows
+
+
+def refresh(force=False):
+    """
+    Обновляет каталог. Пересканируются только папки, у которых изменилось время изменения
+    (появились, удалены или переименованы файлы); force=True пересканирует все.
+    Правка содержимого скрипта время изменения папки не меняет — для нее нужен force=True.
+    Возвращает число пересканированных папок.
+    """
+    dirs = task_dirs()
+    rescanned = 0
+    with transaction() as connection:
+        known = dict(connection.execute('SELECT path, mtime_ns FROM catalog_dirs'))
+        for topic, task_dir in dirs:
+            rel_dir = _rel(task_dir)
+            mtime_ns = os.stat(task_dir).st_mtime_ns
+            if not force and known.get(rel_dir) == mtime_ns:
+                continue
+            connection.execute('DELETE FROM catalog_tasks WHERE task_dir = ?', (rel_dir,))
+            connection.executemany(f'INSERT OR REPLACE INTO catalog_tasks ({COLUMNS}, file_number) '
+                                   'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', scan_tasks(topic, task_dir))
+            connection.execute('INSERT OR REPLACE INTO catalog_dirs (path, mtime_ns) VALUES (?, ?)',
+                               (rel_dir, mtime_ns))
+            rescanned += 1
+
+        # Папки, которых больше нет
+        removed = set(known) - {_rel(task_dir) for _, task_dir in dirs}
+        for rel_dir in removed:
+            connection.execute('DELETE FROM catalog_tasks WHERE task_dir = ?', (rel_dir,))
+            connection.execute('DELETE FROM catalog_dirs WHERE path = ?', (rel_dir,))
+    return rescanned
+
+
+def _task_from_row(row):
+    task_type, task_number, task_dir, status, script, attachments, answer_hash = row
+    return {
+        'task_type': task_type,
+        'task_number': task_number,
+        'task_dir': _abs(task_dir),
+        'status': status,
+        'script': _abs(script),
+        'attachments': [_abs(p) for p in json.loads(attachments)],
+        'answer_hash': answer_hash,
+    }
+
+
+def get_tasks(task_type=None, status=None):
+    """
+    Возвращает задания из каталога (словари с ключами task_type, task_number, task_dir, status,
+    script, attachments, answer_hash), отсортированные по теме и номеру.
+    status: '' — не решалось, '+' — решено верно, '-' — решено неверно.
+    """
+    query = f'SELECT {COLUMNS} FROM catalog_tasks WHERE 1 = 1'
+    params = []
+    if task_type is not None:
+        query += ' AND task_type = ?'
+        params.append(task_type)
+    if status is not None:
+        query += ' AND status = ?'
+        params.append(status)
+    query += ' ORDER BY task_type, task_number, task_dir'
+    with _connection_lock:
+        rows = get_connection().execute(query, params).fetchall()
+    return [_task_from_row(row) for row in rows]
+
+
+def find_task(task_type, task_number):
+    """Возвращает задание по теме и номеру или None (если номер занят в нескольких папках — из первой)."""
+    with _connection_lock:
+        row = get_connection().execute(f'SELECT {COLUMNS} FROM catalog_tasks WHERE task_type = ? AND task_number = ? '
+                                       'ORDER BY task_dir LIMIT 1', (task_type, task_number)).fetchone()
+    return _task_from_row(row) if row else None
+
+
+def collisions():
+    """
+    Задания, зарегистрированные одинаковыми (task_type, task_number) в нескольких файлах:
+    список (task_type, task_number, [скрипты]). Их попытки попадают в одну запись result.db.
+    """
+    with _connection_lock:
+        rows = get_connection().execute('''SELECT task_type, task_number, script FROM catalog_tasks
+                                           WHERE (task_type, task_number) IN (
+                                               SELECT task_type, task_number FROM catalog_tasks
+                                               GROUP BY task_type, task_number HAVING COUNT(*) > 1)
+                                           ORDER BY task_type, task_number, task_dir''').fetchall()
+    result = {}
+    for task_type, task_number, script in rows:
+        result.setdefault((task_type, task_number), []).append(script)
+    return [(task_type, task_number, scripts) for (task_type, task_number), scripts in result.items()]
+
+
+def print_collisions():
+    for task_type, task_number, scripts in collisions():
+        names = ', '.join(script or '(без скрипта)' for script in scripts)
+        print(f"Внимание: задание {task_type}.{task_number} зарегистрировано в нескольких файлах: {names}")
+
+
+def get_scripts(only_registered=True):
+    """Пути скриптов решений; по умолчанию только тех, что вызывают result_register."""
+    return [task['script'] for task in get_tasks()
+            if task['script'] and (task['answer_hash'] or not only_registered)]
+
+
+def main():
+    rescanned = refresh(force='--force' in sys.argv[1:])
+    tasks = get_tasks()
+    print(f"Пересканировано папок: {rescanned}, заданий в каталоге: {len(tasks)}")
+    print_collisions()
+    by_topic = {}
+    for task in tasks:
+        by_topic.setdefault(task['task_type'], []).append(task['status'])
+    for topic, statuses in sorted(by_topic.items()):
+        print(f"Тема {topic:>2}: заданий {len(statuses):>3}, верно {statuses.count('+'):>3}, "
+              f"неверно {statuses.count('-'):>3}, не решалось {statuses.count(''):>3}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Проверка, что многократная проверка заданий в одном процессе не накапливает память.
+
+Во временной копии БД выполняется N синтетических проверок: запись результата и полная
+перерисовка обоих графиков прогресса (PNG сохраняется в память). Пиковый RSS процесса
+замеряется после разогрева и в конце; код возврата 1, если он вырос больше допуска
+или если после проверок остались открытые фигуры pyplot. Только Linux/macOS.
+
+Запуск из корня репозитория:
+    python -m tests.check_memory
+    python -m tests.check_memory --gradings 1000 --tolerance-mb 10
+"""
+import argparse
+import io
+import os
+import random
+import shutil
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+from tests import storage
+from tests.runtime import maxrss_mb
+
+
+def peak_rss_mb():
+    # Модуля resource нет на Windows — там проверка не запускается (см. main)
+    import resource
+
+    return maxrss_mb(resource.getrusage(resource.RUSAGE_SELF))
+
+
+def grade(i, rnd):
+    """Одна синтетическая проверка: результат в БД и перерисовка графиков, как в обработчике."""
+    from tests.conftest import (collect_common_progress, collect_detailed_progress, show_common_progress,
+                                show_detailed_progress_table)
+
+    # Даты старше окна хранения: детальная таблица сворачивает их в строку «Ранее», и ее размер
+    # не растет вместе с числом попыток — рост памяти тогда означает утечку, а не больший рисунок
+    date_time = datetime.now() - timedelta(days=400) + timedelta(minutes=i)
+    storage.add_result(date_time.isoformat(), rnd.randint(1, 500), rnd.randint(1, 27), rnd.randint(0, 1))
+    for collect, show in ((collect_common_progress, show_common_progress),
+                          (collect_detailed_progress, show_detailed_progress_table)):
+        fig = show(collect())
+        fig.savefig(io.BytesIO(), format='png')
+        fig.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Рост памяти при многократной проверке заданий')
+    parser.add_argument('--gradings', type=int, default=500)
+    parser.add_argument('--warmup', type=int, default=50)
+    parser.add_argument('--tolerance-mb', type=float, default=20.0)
+    args = parser.parse_args()
+
+    if os.name == 'nt':
+        print("Проверка недоступна на Windows: пиковый RSS замеряется через модуль resource (Linux/macOS)")
+        return 0
+
+    tmp_dir = tempfile.mkdtemp(prefix='ege_memory_')
+    os.environ['EGE_RESULT_DB'] = os.path.join(tmp_dir, 'result.db')
+    storage.close_connection()
+    rnd = random.Random(0)
+    try:
+        for i in range(args.warmup):
+            grade(i, rnd)
+        warm = peak_rss_mb()
+        for i in range(args.warmup, args.warmup + args.gradings):
+            grade(i, rnd)
+            if (i - args.warmup + 1) % 100 == 0:
+                print(f"  {i - args.warmup + 1:>5} проверок: пиковый RSS {peak_rss_mb():.1f} МБ")
+        final = peak_rss_mb()
+    finally:
+        storage.close_connection()
+        os.environ.pop('EGE_RESULT_DB', None)
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    ok = True
+    print(f"Пиковый RSS: после разогрева {warm:.1f} МБ, после {args.gradings} проверок {final:.1f} МБ "
+          f"(рост {final - warm:+.1f} МБ, допуск {args.tolerance_mb:.0f} МБ)")
+    if final - warm > args.tolerance_mb:
+        ok = False
+        print("ОШИБКА: память растет с числом проверок")
+    if 'matplotlib.pyplot' in sys.modules:
+        open_figures = len(sys.modules['matplotlib.pyplot'].get_fignums())
+        if open_figures:
+            ok = False
+            print(f"ОШИБКА: осталось открытых фигур pyplot: {open_figures}")
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,116 +2,76 @@ import hashlib
 import os
 import time
 import sys
-import sqlite3
 import subprocess
-import threading
 import json
 from collections import defaultdict
 from datetime import datetime
 
-import numpy as np
-from matplotlib import pyplot as plt
-from matplotlib.colors import Normalize, LinearSegmentedColormap, ListedColormap
-import matplotlib.patches as mpatches
+# numpy и matplotlib импортируются внутри функций построения графиков: скрипт задания,
+# который только печатает вердикт, не должен платить за их загрузку
+
+from .storage import (
+    add_result, get_progress_daily, get_common_progress_stats, get_render_digest, set_render_digest,
+    history_cutoff, get_rollup_totals,
+)
+from .rename_worker import get_db as get_queue_db, notify_worker, worker_alive, note_worker_pid, scan_task_dir
+from .git_writer import commit_paths
+from .trace import stage, record_stage, enabled as trace_enabled, flush as flush_trace
+from .runtime import maxrss_mb
 
 
 def repo_root():
     # Корень репозитория — родительская папка для tests/
     return os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 
-# Глобальный лок для операций Git, чтобы избежать конфликтов при параллельном доступе
-git_lock = threading.Lock()
+def open_queue_db():
+    """Открывает БД очереди фоновых задач, создавая таблицы при необходимости."""
+    # Схема очереди принадлежит обработчику
+    return get_queue_db()
 
-def git_add_file(file_path):
-    """Добавляет файл в отслеживаемые Git."""
-    # Повторяем попытки, если git заблокирован
-    for _ in range(5):
-        with git_lock:
-            try:
-                if not os.path.exists(file_path):
-                    return False, f"Файл не найден перед git add: {file_path}"
-
-                # Проверяем, находится ли файл в Git-репозитории
-                git_dir = os.path.join(repo_root(), '.git')
-                if not os.path.isdir(git_dir):
-                    return False, "Директория .git не найдена, возможно это не Git-репозиторий"
-
-                # Используем относительный путь для git и заменяем слеши на прямые (для Windows)
-                rel_path = os.path.relpath(file_path, repo_root())
-                rel_path = rel_path.replace(os.sep, '/')
-
-                # Выполняем команду git add для указанного файла
-                flags = 0x08000000 if os.name == 'nt' else 0
-                result = subprocess.run(
-                    ['git', 'add', rel_path],
-                    cwd=repo_root(),  # Устанавливаем рабочую директорию в корень репозитория
-                    check=False,  # Не вызываем исключение при ошибке
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    text=True,
-                    encoding='utf-8', 
-                    errors='replace',
-                    creationflags=flags
-                )
-
-                if result.returncode == 0:
-                    return True, "Файл успешно добавлен в отслеживаемые"
-                else:
-                    if "index.lock" in result.stderr:
-                        time.sleep(1)
-                        continue
-                    return False, f"Ошибка при добавлении файла: {result.stderr}"
-            except Exception as e:
-                return False, f"Исключение при работе с Git: {str(e)}"
-    return False, "Git заблокирован слишком долго"
 
+def spawn_worker():
+    """Запускает фоновый обработчик очереди (если он уже запущен, новый процесс сразу завершится)."""
+    worker_script = os.path.join(os.path.dirname(__file__), 'rename_worker.py')
+    flags = 0x08000000 | 0x00000008 | 0x00000200 if os.name == 'nt' else 0
 
-def git_commit(message="Автоматическое обновление статуса заданий"):
-    """Создает коммит с указанным сообщением."""
-    for _ in range(5):
-        with git_lock:
-            try:
-                # Проверяем, находится ли файл в Git-репозитории
-                git_dir = os.path.join(repo_root(), '.git')
-                if not os.path.isdir(git_dir):
-                    return False, "Директория .git не найдена, возможно это не Git-репозиторий"
-        
-                # Выполняем команду git commit
-                flags = 0x08000000 if os.name == 'nt' else 0
-                result = subprocess.run(
-                    ['git', 'commit', '-m', message],
-                    cwd=repo_root(),  # Устанавливаем рабочую директорию в корень репозитория
-                    check=False,  # Не вызываем исключение при ошибке
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    text=True,
-                    creationflags=flags
-                )
-        
-                if result.returncode == 0:
-                    return True, "Коммит успешно создан"
-                else:
-                    # Если нет изменений для коммита, это не ошибка
-                    if "nothing to commit" in result.stdout or "nothing to commit" in result.stderr:
-                        return True, "Нет изменений для коммита"
-                    if "index.lock" in result.stderr:
-                        time.sleep(1)
-                        continue
-                    return False, f"Ошибка при создании коммита: {result.stderr}"
-            except Exception as e:
-                return False, f"Исключение при работе с Git: {str(e)}"
-    return False, "Git заблокирован слишком долго"
+    try:
+        process = subprocess.Popen(
+            [sys.executable, worker_script],
+            # Не наследуем stdout/stderr, иначе вызывающий процесс (или конвейер) ждет завершения обработчика
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            creationflags=flags,
+            close_fds=True,
+            start_new_session=True if os.name != 'nt' else False
+        )
+        note_worker_pid(process.pid)
+    except Exception:
+        pass
+
+
+def wake_worker():
+    """Будит фоновый обработчик и запускает его, если он еще не работает."""
+    # Уведомление принял живой обработчик — он сам заберет задачу из очереди. Если он как раз
+    # завершается, то после снятия блокировки еще раз проверит очередь (см. rename_worker.main).
+    # Без Unix-сокетов (Windows) уведомить нельзя, и процесс запускается как раньше
+    if notify_worker():
+        return
+    # Обработчик запущен предыдущей отправкой и еще не открыл сокет: он сам проверит очередь
+    if worker_alive():
+        return
+    # Число запусков видно в `python tests/rename_worker.py --stats` и в отчете tests.trace
+    with stage('spawn_worker'):
+        spawn_worker()
 
 
-def rename_when_closed(task_dir, file_list, commit_msg=None):
+def rename_when_closed(task_dir, file_list, commit_msg=None, start_worker=True):
     """
     Добавляет задачу на переименование группы файлов в очередь (SQLite) и запускает фоновый процесс-обработчик.
     file_list: список словарей [{'base': '...', 'target': '...'}, ...]
     """
     try:
-        # Добавляем в очередь
-        db_path = os.path.join(os.path.dirname(__file__), 'rename_queue.db')
-        
         # Генерируем уникальный ключ для задачи (чтобы обновлять статус одной и той же задачи)
         # Ключ = путь_папки + имена_файлов
         files_key = ",".join(sorted([f['base'] for f in file_list]))
@@ -119,148 +79,148 @@ def rename_when_closed(task_dir, file_list, commit_msg=None):
         
         files_json = json.dumps(file_list)
         
-        with sqlite3.connect(db_path) as conn:
-            conn.execute('''
-                CREATE TABLE IF NOT EXISTS tasks (
-                    id INTEGER PRIMARY KEY, 
-                    task_dir TEXT, 
-                    files TEXT, 
-                    commit_msg TEXT,
-                    unique_key TEXT UNIQUE ON CONFLICT REPLACE
-                )
-            ''')
+        with open_queue_db() as conn:
             conn.execute(
-                "INSERT INTO tasks (task_dir, files, commit_msg, unique_key) VALUES (?, ?, ?, ?)",
-                (task_dir, files_json, commit_msg or "Авто-обновление статуса задания", unique_key)
+                "INSERT INTO tasks (task_dir, files, commit_msg, unique_key, queued_at) VALUES (?, ?, ?, ?, ?)",
+                (task_dir, files_json, commit_msg or "Авто-обновление статуса задания", unique_key, time.time())
             )
     except Exception as e:
         print(f"Ошибка при добавлении в очередь переименования: {e}")
         return
 
-    # Запускаем worker, если он еще не запущен
-    worker_script = os.path.join(os.path.dirname(__file__), 'rename_worker.py')
-    flags = 0x08000000 | 0x00000008 | 0x00000200 if os.name == 'nt' else 0
+    # Будим worker или запускаем его, если он еще не запущен
+    if start_worker:
+        wake_worker()
+
 
+def request_progress_update(start_worker=True):
+    """
+    Ставит в очередь перерисовку графиков прогресса и их коммит.
+    Повторные запросы до обработки не накапливаются: обработчик сделает одну отрисовку и один коммит.
+    """
     try:
-        subprocess.Popen(
-            [sys.executable, worker_script],
-            creationflags=flags,
-            close_fds=True,
-            start_new_session=True if os.name != 'nt' else False
-        )
-    except Exception:
-        pass
+        with open_queue_db() as conn:
+            conn.execute("INSERT OR REPLACE INTO render_requests (id, requested_at) VALUES (1, ?)",
+                         (time.time(),))
+    except Exception as e:
+        print(f"Ошибка при постановке задачи на обновление графиков: {e}")
+        return
 
+    if start_worker:
+        wake_worker()
 
-def db_path():
-    # БД всегда в tests/result.db относительно корня репозитория
-    return os.path.join(repo_root(), 'tests', 'result.db')
-
-
-def create_new_db():
-    os.makedirs(os.path.dirname(db_path()), exist_ok=True)
-    with sqlite3.connect(db_path()) as connection:
-        cursor = connection.cursor()
-        cursor.execute('''
-                       CREATE TABLE IF NOT EXISTS test (
-                                                           date_time   DATETIME,
-                                                           task_number BIGINT,
-                                                           task_type   INTEGER,
-                                                           result      INTEGER
-                       )
-                       ''')
-
-
-def add_result(date_time, task_number, task_type, result):
-    if not os.path.exists(db_path()):
-        create_new_db()
-    with sqlite3.connect(db_path()) as connection:
-        cursor = connection.cursor()
-        # Проверяем, был ли хоть раз правильный результат
-        cursor.execute('SELECT 1 FROM test WHERE task_number = ? AND task_type = ? AND result = 1',
-                       (task_number, task_type))
-        if cursor.fetchone():
-            return  # Если был хоть раз правильный результат, то не добавляем
-        
-        # В остальных случаях добавляем новую запись
-        cursor.execute('INSERT INTO test (date_time, task_number, task_type, result) VALUES (?, ?, ?, ?)',
-                       (date_time, task_number, task_type, result))
 
+# Ключ строки «Ранее» в данных детальной таблицы: все попытки старше окна хранения одной строкой
+OLDER_BAND = 'older'
 
-def update_result(date_time, task_number, task_type, result):
-    with sqlite3.connect(db_path()) as connection:
-        cursor = connection.cursor()
-        cursor.execute('UPDATE test SET date_time = ?, result = ? WHERE task_type = ? AND task_number = ?',
-                       (date_time, result, task_type, task_number))
 
+def collect_detailed_progress():
+    """
+    Возвращает данные детальной таблицы: {'YYYY-MM-DD': {task_type: [(task_number, result), ...]}}.
+    Попытки в ячейке отсортированы по номеру задания, новые попытки идут первыми.
+    Даты старше окна хранения (history_cutoff) и свернутая история собираются в строку OLDER_BAND:
+    {task_type: [(верных, 1), (неверных, 0)]} — так высота таблицы не растет со временем.
+    """
+    progress = defaultdict(lambda: defaultdict(list))
+    cutoff = history_cutoff()
+    # task_type -> [верных, неверных] для строки «Ранее»
+    older = defaultdict(lambda: [0, 0])
+
+    # Сортируем по номеру задания. Верная попытка всегда последняя (после нее попытки не записываются),
+    # поэтому она идет первой, а за ней неверные — новые попытки отображаются выше старых (как и даты).
+    for day, task_type, task_number, attempts, correct in sorted(get_progress_daily(), key=lambda x: x[2]):
+        if day < cutoff:
+            older[task_type][0] += correct
+            older[task_type][1] += attempts - correct
+            continue
+        tasks = progress[day][task_type]
+        tasks.extend([(task_number, 1)] * correct)
+        tasks.extend([(task_number, 0)] * (attempts - correct))
 
-def get_result(task_number, task_type):
-    with sqlite3.connect(db_path()) as connection:
-        cursor = connection.cursor()
-        cursor.execute('SELECT * FROM test WHERE task_number = ? AND task_type = ?',
-                       (task_number, task_type))
-        return cursor.fetchone()
+    for task_type, (correct, attempts) in get_rollup_totals().items():
+        older[task_type][0] += correct
+        older[task_type][1] += attempts - correct
+    for task_type, (correct, wrong) in older.items():
+        progress[OLDER_BAND][task_type] = [(n, r) for n, r in ((correct, 1), (wrong, 0)) if n]
+    return progress
 
 
-def get_results():
-    with sqlite3.connect(db_path()) as connection:
-        cursor = connection.cursor()
-        cursor.execute('SELECT * FROM test')
-        return cursor.fetchall()
+def new_figure(figsize):
+    """
+    Создает фигуру с одними осями на холсте Agg, минуя pyplot. pyplot хранит ссылки на все открытые
+    фигуры, пока их не закроют, а такая фигура освобождается вместе с последней ссылкой на нее;
+    бэкенд при этом не зависит от окружения (IDE, ноутбук, обработчик без дисплея).
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
 
-def show_detailed_progress_table():
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig, fig.subplots()
+
+
+def text_collection(ax, labels, fontsize):
+    """
+    Одна коллекция с подписями labels [(текст, x, y), ...], выровненными по центру точки (x, y) в данных.
+    Глифы превращаются в контуры (TextPath) один раз на каждую уникальную строку.
+    """
+    from matplotlib.collections import PathCollection
+    from matplotlib.font_manager import FontProperties
+    from matplotlib.path import Path
+    from matplotlib.textpath import TextPath
+    from matplotlib.transforms import IdentityTransform
+
+    prop = FontProperties(size=fontsize)
+    cache = {}
+    paths = []
+    for text, _, _ in labels:
+        path = cache.get(text)
+        if path is None:
+            raw = TextPath((0, 0), text, prop=prop)
+            # Центрируем контур по габаритам его вершин (как ha='center', va='center');
+            # точные габариты кривых Безье (get_extents) считаются на порядок дольше
+            center = (raw.vertices.min(axis=0) + raw.vertices.max(axis=0)) / 2
+            path = Path(raw.vertices - center, raw.codes)
+            cache[text] = path
+        paths.append(path)
+    # Как в scatter: размер контуров в пунктах (sizes=[1] переводит пункты в пиксели), положение — в данных.
+    # transform задается явно, иначе add_collection применит к контурам transData
+    return PathCollection(paths, sizes=[1], offsets=[(x, y) for _, x, y in labels],
+                          offset_transform=ax.transData, transform=IdentityTransform(),
+                          facecolors='black', edgecolors='none', linewidths=0, zorder=3)
+
+
+def show_detailed_progress_table(progress=None):
     """
     Создает таблицу, где:
     - По горизонтали расположены типы заданий (1-27)
     - По вертикали расположены даты решения
     - На пересечении отображаются номера заданий с цветовой индикацией правильности решения
+    progress — результат collect_detailed_progress() (если не передан, собирается из БД).
     """
-    results = get_results()
+    import numpy as np
+    from matplotlib.collections import LineCollection, PolyCollection
+
+    if progress is None:
+        progress = collect_detailed_progress()
 
-    if not results:
-        fig, ax = plt.subplots(figsize=(12, 5))
+    if not progress:
+        fig, ax = new_figure(figsize=(12, 5))
         ax.text(0.5, 0.5, "Нет данных для отображения", ha='center', va='center', fontsize=14)
         ax.set_axis_off()
         return fig
 
-    # Сортируем результаты по времени, чтобы попытки отображались в хронологическом порядке
-    results.sort(key=lambda x: x[0])
-
-    # Группируем результаты по дате и типу задания
     # date -> task_type -> list[(task_number, result)]
-    date_type_task_result = defaultdict(lambda: defaultdict(list))
-
-    # Собираем все уникальные даты и типы заданий
-    all_dates = set()
-    all_types = set()
-
-    for dt, task_number, task_type, result in results:
-        # Нормализация результата к 0/1
-        try:
-            r = int(result)
-            r = 1 if r == 1 else 0
-        except Exception:
-            continue
-
-        # Преобразуем дату в объект date
-        date_only = None
-        try:
-            date_only = datetime.fromisoformat(str(dt)).date()
-        except Exception:
-            try:
-                ts = float(dt)
-                date_only = datetime.fromtimestamp(ts).date()
-            except Exception:
-                continue
-
-        # Сохраняем ВСЕ результаты (попытки)
-        date_type_task_result[date_only][int(task_type)].append((int(task_number), r))
-        all_dates.add(date_only)
-        all_types.add(int(task_type))
+    date_type_task_result = {datetime.fromisoformat(day).date(): cells
+                             for day, cells in progress.items() if day != OLDER_BAND}
 
     # Сортируем даты и типы заданий
-    sorted_dates = sorted(all_dates, reverse=True)  # Последние даты сверху
-    sorted_types = sorted(all_types)  # Типы заданий по порядку
+    sorted_dates = sorted(date_type_task_result, reverse=True)  # Последние даты сверху
+    # Строка «Ранее» — последней: в ее ячейках вместо номеров заданий количество верных и неверных попыток
+    if progress.get(OLDER_BAND):
+        date_type_task_result[OLDER_BAND] = progress[OLDER_BAND]
+        sorted_dates.append(OLDER_BAND)
+    sorted_types = sorted({t for cells in progress.values() for t in cells})  # Типы заданий по порядку
 
     # Создаем фигуру и оси
     # Мы не можем заранее знать высоту, поэтому сначала рассчитаем необходимые высоты строк
@@ -292,78 +252,62 @@ def show_detailed_progress_table():
     total_plot_height = abs(current_y)
     
     # Создаем фигуру с адаптивной высотой
-    fig, ax = plt.subplots(figsize=(15, max(4, total_plot_height * 0.5)))
+    fig, ax = new_figure(figsize=(15, max(4, total_plot_height * 0.5)))
     
     # Настраиваем пределы осей
     ax.set_xlim(-0.5, len(sorted_types) - 0.5)
     ax.set_ylim(current_y, 0)
     
-    # Рисуем сетку и данные
+    # Все блоки, подписи и линии сетки собираются в списки и добавляются несколькими коллекциями:
+    # отдельный artist на каждую попытку делает компоновку и savefig медленными на длинной истории
+    block_width = 1.0 - 0.1  # Блоки занимают ширину ячейки за вычетом небольших отступов по бокам
+    block_h = task_height - task_gap  # Высота блока с учетом зазора
+    blocks = []        # левый нижний угол блока (x, y)
+    block_colors = []
+    labels = []        # (текст, x центра, y центра)
+    row_bottoms = []
+
     for i, date in enumerate(sorted_dates):
         y_start, h = row_y_starts[i]
         y_center = y_start - h / 2
-        
+
         # Горизонтальная линия разделителя (нижняя граница строки)
-        ax.axhline(y_start - h, color='lightgray', linewidth=1)
-        
+        row_bottoms.append(y_start - h)
+
         # Подпись даты слева
-        ax.text(-0.6, y_center, date.strftime('%d.%m.%Y'), 
+        label = "Ранее\n(попыток)" if date == OLDER_BAND else date.strftime('%d.%m.%Y')
+        ax.text(-0.6, y_center, label,
                 ha='right', va='center', fontsize=9, fontweight='bold')
-        
-        # Рисуем данные по столбцам
+
+        # Отступ сверху внутри ячейки
+        cell_top = y_start - row_padding / 2
         for j, task_type in enumerate(sorted_types):
-            if task_type in date_type_task_result[date]:
-                tasks = date_type_task_result[date][task_type]
-                # Сортируем по номеру задания. 
-                # Сначала разворачиваем список (reversed), чтобы последние попытки шли первыми (stable sort сохранит это).
-                # Таким образом, новые попытки будут отображаться выше старых (как и даты).
-                sorted_tasks = sorted(reversed(tasks), key=lambda x: x[0])
-                
-                num_tasks = len(sorted_tasks)
-                if num_tasks > 0:
-                    # Рисуем блоки заданий
-                    # Блоки занимают всю доступную ширину ячейки (1.0 минус отступы)
-                    cell_width = 1.0
-                    block_width = cell_width - 0.1 # Небольшой отступ по бокам
-                    
-                    # Начальный Y для первого блока в этой ячейке
-                    # Отступ сверху внутри ячейки
-                    cell_top = y_start - row_padding / 2
-                    
-                    for k, (task_num, res) in enumerate(sorted_tasks):
-                        color = '#ccffcc' if res == 1 else '#ffcccc'
-                        
-                        # Границы слота
-                        slot_bottom = cell_top - (k + 1) * task_height
-                        
-                        # Вычисляем высоту блока с учетом зазора
-                        block_h = task_height - task_gap
-                        # Центрируем блок в слоте (или сдвигаем, чтобы зазор был между блоками)
-                        # Зазор разделим пополам сверху и снизу
-                        block_y = slot_bottom + task_gap / 2
-                        
-                        # Рисуем прямоугольник
-                        rect = mpatches.Rectangle(
-                            (j - block_width/2, block_y), 
-                            block_width, block_h,
-                            facecolor=color, edgecolor='gray', linewidth=0.5
-                        )
-                        ax.add_patch(rect)
-                        
-                        # Текст (по центру блока)
-                        symbol = "+" if res == 1 else "−"
-                        txt = f"{symbol}{task_num}"
-                        
-                        # Текст выравниваем по центру вычисленного блока
-                        text_x = j
-                        text_y = block_y + block_h / 2
-                        
-                        ax.text(text_x, text_y, txt, 
-                                ha='center', va='center', fontsize=8)
-
-    # Вертикальные линии сетки
-    for j in range(len(sorted_types) + 1):
-        ax.axvline(j - 0.5, color='lightgray', linewidth=1)
+            for k, (task_num, res) in enumerate(date_type_task_result[date].get(task_type, ())):
+                # Зазор делим пополам сверху и снизу слота
+                block_y = cell_top - (k + 1) * task_height + task_gap / 2
+                blocks.append((j - block_width / 2, block_y))
+                block_colors.append('#ccffcc' if res == 1 else '#ffcccc')
+                symbol = "+" if res == 1 else "−"
+                labels.append((f"{symbol}{task_num}", j, block_y + block_h / 2))
+
+    if blocks:
+        corners = np.array(blocks)
+        # Вершины прямоугольников: (N, 4, 2)
+        verts = np.stack([corners,
+                          corners + (block_width, 0),
+                          corners + (block_width, block_h),
+                          corners + (0, block_h)], axis=1)
+        ax.add_collection(PolyCollection(verts, facecolors=block_colors, edgecolors='gray', linewidths=0.5),
+                          autolim=False)
+        ax.add_collection(text_collection(ax, labels, fontsize=8), autolim=False)
+
+    # Линии сетки на всю ширину/высоту осей, как axhline/axvline
+    ax.add_collection(LineCollection([[(0, y), (1, y)] for y in row_bottoms],
+                                     colors='lightgray', linewidths=1, zorder=2,
+                                     transform=ax.get_yaxis_transform()), autolim=False)
+    ax.add_collection(LineCollection([[(j - 0.5, 0), (j - 0.5, 1)] for j in range(len(sorted_types) + 1)],
+                                     colors='lightgray', linewidths=1, zorder=2,
+                                     transform=ax.get_xaxis_transform()), autolim=False)
 
     # Настраиваем оси X
     ax.set_xticks(np.arange(len(sorted_types)))
@@ -380,45 +324,14 @@ def show_detailed_progress_table():
     ax.set_title("Детальный прогресс по заданиям", pad=20)
 
     # Настраиваем размер фигуры и отступы
-    plt.tight_layout()
+    fig.tight_layout()
 
     return fig
 
-def show_common_progress():
-    """
-    Получить из БД все разультаты и сгруппировать их по полю task_type.
-    Для каждого типа посчитать процент правильных ответов среди всех решенных заданий данного типа,
-    в подсчёт включаются только данные за последние 5 дат.
-    При этом необходимо находить среднее значение по каждому номеру задания (task_number).
-    Построить гистограмму, где на оси X будут номера тем, а на Y — процент правильных ответов.
-    """
-    from collections import defaultdict
-
-    results = get_results()
-
-    # type -> date -> task_number -> list[result]
-    type_date_task_values = defaultdict(lambda: defaultdict(lambda: defaultdict(list)))
-
-    for dt, task_number, task_type, result in results:
-        # Нормализация результата к 0/1, некорректные значения/строки пропускаем
-        try:
-            r = int(result)
-            r = 1 if r == 1 else 0
-        except Exception:
-            continue
-
-        # Преобразуем дату в объект date (сначала ISO, затем timestamp для обратной совместимости)
-        date_only = None
-        try:
-            date_only = datetime.fromisoformat(str(dt)).date()
-        except Exception:
-            try:
-                ts = float(dt)
-                date_only = datetime.fromtimestamp(ts).date()
-            except Exception:
-                continue
-
-        type_date_task_values[int(task_type)][date_only][int(task_number)].append(r)
+def collect_common_progress():
+    """Возвращает показатели успеваемости (в процентах) по темам 1..27 для гистограммы общего прогресса."""
+    # type -> task_number -> (верных, попыток) за последние 5 дат; type -> число когда-либо решённых заданий
+    recent, solved = get_common_progress_stats()
 
     # Считаем процент по каждому типу: берём последние 5 дат, считаем среднее по каждому task_number,
     # затем усредняем по task_number и переводим в проценты
@@ -426,41 +339,17 @@ def show_common_progress():
     percentages = []
 
     for t in x_types:
-        date_map = type_date_task_values.get(t, {})
-        if not date_map:
-            percentages.append(0.0)
-            continue
-
-        last_dates = sorted(date_map.keys(), reverse=True)[:5]
-        if not last_dates:
+        task_stats = recent.get(t, {})
+        per_task_means = [correct / attempts for correct, attempts in task_stats.values() if attempts > 0]
+        if not per_task_means:
             percentages.append(0.0)
             continue
 
-        task_to_values = defaultdict(list)
-        for d in last_dates:
-            for task_num, vals in date_map[d].items():
-                task_to_values[task_num].extend(vals)
-
-        if not task_to_values:
-            percentages.append(0.0)
-            continue
+        percent = (sum(per_task_means) / len(per_task_means)) * 100
 
-        per_task_means = []
-        for vals in task_to_values.values():
-            if len(vals) > 0:
-                per_task_means.append(sum(vals) / len(vals))
+        # Рассчитываем коэффициент на основе ВСЕХ когда-либо решённых заданий данного типа
+        total_correct_count = solved.get(t, 0)
 
-        percent = (sum(per_task_means) / len(per_task_means)) * 100 if per_task_means else 0.0
-        
-        # Рассчитываем коэффициент на основе ВСЕ когда-либо решённых заданий данного типа
-        # Считаем общее количество верно решённых заданий для данного типа из всех дат
-        total_correct_count = 0
-        for date_data in type_date_task_values[t].values():
-            for vals in date_data.values():
-                # Каждое задание (task_number) считается один раз, берём его максимальное значение
-                if len(vals) > 0 and max(vals) == 1.0:
-                    total_correct_count += 1
-        
         # Применяем коэффициент на основе общего количества верно решённых заданий
         if total_correct_count < 10:
             coefficient = (total_correct_count * 10) / 100.0  # 10% за каждое верное задание
@@ -470,8 +359,26 @@ def show_common_progress():
         percent = percent * coefficient
         percentages.append(percent)
 
+    return percentages
+
+
+def show_common_progress(percentages=None):
+    """
+    Получить из БД все разультаты и сгруппировать их по полю task_type.
+    Для каждого типа посчитать процент правильных ответов среди всех решенных заданий данного типа,
+    в подсчёт включаются только данные за последние 5 дат.
+    При этом необходимо находить среднее значение по каждому номеру задания (task_number).
+    Построить гистограмму, где на оси X будут номера тем, а на Y — процент правильных ответов.
+    percentages — результат collect_common_progress() (если не передан, собирается из БД).
+    """
+    from matplotlib.colors import Normalize, LinearSegmentedColormap
+
+    if percentages is None:
+        percentages = collect_common_progress()
+    x_types = list(range(1, 28))  # 1..27
+
     # Построение гистограммы
-    fig, ax = plt.subplots(figsize=(12, 5))
+    fig, ax = new_figure(figsize=(12, 5))
     norm = Normalize(vmin=0, vmax=100)
     # Цветовая схема
     cmap = LinearSegmentedColormap.from_list("red_green", ["red", "orange", "green"])
@@ -497,6 +404,73 @@ def show_common_progress():
 
     return fig
 
+# Список поддерживаемых расширений файлов задания
+TASK_FILE_EXTENSIONS = ['.md', '.png', '.py', '.jpg', '.ods', '.xlsx', '.odt', '.docx', '.doc', '.xls', '.csv', '.txt', '.pdf']
+
+
+def find_task_files(task_type, number, is_correct):
+    """
+    Находит файлы задания в папке темы. Возвращает (task_dir, [{'base': ..., 'target': ...}, ...]),
+    где target — имя файла с префиксом '+' или '-'. Если папки или файлов нет — (None, []).
+    """
+    try:
+        t = int(task_type)
+        n = int(number)
+    except Exception:
+        return None, []
+
+    # Строим путь относительно корня репозитория, отталкиваясь от текущего файла tests/conftest.py.
+    # Папка сканируется один раз; дальше наличие файлов проверяется по индексу без обращений к диску
+    index = None
+    for task_dir in (os.path.join(repo_root(), f"Тема {t}", "Задания"),
+                     os.path.join(repo_root(), "ЕГЭ", f"Тема {t}", "Задания")):
+        index = scan_task_dir(task_dir)
+        if index is not None:
+            break
+    if index is None:
+        return None, []
+
+    sign = '+' if is_correct else '-'
+    files = []
+    for ext in TASK_FILE_EXTENSIONS:
+        base_name = f"Задание {n}{ext}"
+        # Проверяем наличие любой версии файла (оригинал, +, -)
+        if base_name in index:
+            files.append({'base': base_name, 'target': sign + base_name})
+    return task_dir, files
+
+
+def status_commit_message(task_type, number, res):
+    return f"Обновлен статус задания № {number} Тема: {task_type} > {('Верно' if res else 'Неверно')}"
+
+
+def process_uptime():
+    """Секунды с запуска текущего процесса (Linux, по /proc) или None, если узнать нельзя."""
+    try:
+        with open('/proc/self/stat') as f:
+            # Имя процесса в скобках может содержать пробелы: поля считаются после ')'
+            fields = f.read().rsplit(')', 1)[1].split()
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+        # starttime — 22-е поле, в тиках с загрузки системы
+        return uptime - int(fields[19]) / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def process_usage():
+    """
+    Потребление ресурсов скриптом решения к моменту вызова: (секунды с запуска интерпретатора,
+    процессорное время, пиковый RSS в МБ). Незамеренные значения — None (Windows, macOS без /proc).
+    """
+    try:
+        import resource
+    except ImportError:
+        return process_uptime(), time.process_time(), None
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return process_uptime(), usage.ru_utime + usage.ru_stime, maxrss_mb(usage)
+
+
 def result_register(task_type, number, result, right_result):
     """
     Помечать файл задания, добавляя к имени файла в начало '+' или '-', соответственно.
@@ -504,73 +478,98 @@ def result_register(task_type, number, result, right_result):
     Файлы располагаются в подпапке: Тема {task_type}/Задания/
     Имя файла: "Задание {number}.md" или "Задание {number}.png".
     """
-    res = 1 if hashlib.md5(str(result).encode()).hexdigest() == right_result else 0
+    # Ресурсы замеряются первыми, чтобы в них не вошла сама запись результата
+    usage = process_usage()
+    started = time.perf_counter()
+    with stage('hash'):
+        res = 1 if hashlib.md5(str(result).encode()).hexdigest() == right_result else 0
     # Храним дату в читабельном ISO-формате
-    add_result(datetime.now().isoformat(), number, task_type, res)
+    with stage('add_result'):
+        add_result(datetime.now().isoformat(), number, task_type, res, usage)
 
     def mark_task_files(task_type, number, is_correct):
         """Ищет файлы задания (.md и .png и пр.) и переименовывает, добавляя префикс '+' или '-'"""
-        try:
-            t = int(task_type)
-            n = int(number)
-        except Exception:
-            return []
-
-        # Строим путь относительно корня репозитория, отталкиваясь от текущего файла tests/conftest.py
-        task_dir = os.path.join(repo_root(), f"Тема {t}", "Задания")
-
-        if not os.path.isdir(task_dir):
-            task_dir = os.path.join(repo_root(), "ЕГЭ", f"Тема {t}", "Задания")
-        if not os.path.isdir(task_dir):
-            return []
-
-        # Список поддерживаемых расширений файлов
-        extensions = ['.md', '.png', '.py', '.jpg', '.ods', '.xlsx', '.odt', '.docx', '.doc', '.xls', '.csv', '.txt', '.pdf']
-        # Список найденных файлов
-        files_to_rename = []
-        renamed_paths = []
-        sign = '+' if is_correct else '-'
-        commit_msg = f"Обновлен статус задания № {number} Тема: {task_type} > {('Верно' if res else 'Неверно')}"
-
-        for ext in extensions:
-            base_name = f"Задание {n}{ext}"
-            target_name = sign + base_name
-            
-            # Проверяем наличие любой версии файла (оригинал, +, -)
-            file_exists = False
-            for prefix in ['', '+', '-']:
-                if os.path.exists(os.path.join(task_dir, prefix + base_name)):
-                    file_exists = True
-                    break
-            
-            if not file_exists:
-                continue
-
-            files_to_rename.append({'base': base_name, 'target': target_name})
-            renamed_paths.append(os.path.join(task_dir, target_name))
+        task_dir, files_to_rename = find_task_files(task_type, number, is_correct)
+        renamed_paths = [os.path.join(task_dir, f['target']) for f in files_to_rename]
+        commit_msg = status_commit_message(task_type, number, res)
 
         if files_to_rename:
             try:
                 # Переименование группы файлов в фоновом режиме
-                rename_when_closed(task_dir, files_to_rename, commit_msg=commit_msg)
+                rename_when_closed(task_dir, files_to_rename, commit_msg=commit_msg, start_worker=False)
             except Exception as e:
                 print(f"Ошибка при постановке задачи на переименование: {str(e)}")
 
         return renamed_paths
 
-    mark_task_files(task_type, number, res == 1)
-    fig = show_common_progress()
-    fig_path = f'{repo_root()}/tests/common_progress.png'
-    fig.savefig(fig_path)
+    # Графики и коммиты строятся фоновым обработчиком, чтобы вердикт возвращался сразу после записи в БД
+    with stage('request_progress_update'):
+        request_progress_update(start_worker=False)
+    with stage('mark_task_files'):
+        mark_task_files(task_type, number, res == 1)
+    with stage('wake_worker'):
+        wake_worker()
+
+    # Замеры записываются, только если включены переменной окружения EGE_TRACE
+    if trace_enabled():
+        record_stage('total', time.perf_counter() - started)
+        flush_trace('result_register')
+    return "Верно" if res else "Неверно"
 
-    # Создаем и сохраняем детальную таблицу прогресса
-    detail_fig = show_detailed_progress_table()
-    detail_fig_path = f'{repo_root()}/tests/detailed_progress.png'
-    detail_fig.savefig(detail_fig_path)
 
-    # Добавляем график прогресса в Git и создаем коммит (для графиков отдельный коммит, если они изменились)
-    git_add_file(fig_path)
-    git_add_file(detail_fig_path)
-    git_commit(f"Обновлены графики прогресса")
-    
-    return "Верно" if res else "Неверно"
+# Версия отрисовки входит в хэш данных: при изменении оформления графиков ее нужно увеличить
+RENDER_VERSION = 2
+
+
+def progress_digest(data):
+    """Хэш входных данных графика — по нему определяется, нужно ли перерисовывать PNG."""
+    payload = json.dumps([RENDER_VERSION, data], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def render_progress_charts():
+    """
+    Перерисовывает графики прогресса, данные которых изменились с прошлой отрисовки.
+    Возвращает список (имя, путь к PNG, хэш данных). Хэш не сохраняется: его записывает
+    тот, кто закоммитил графики (set_render_digest), — иначе после неудачного коммита
+    график считался бы актуальным и больше не попал бы в Git.
+    """
+    charts = [
+        ('common_progress', collect_common_progress, show_common_progress),
+        ('detailed_progress', collect_detailed_progress, show_detailed_progress_table),
+    ]
+    rendered = []
+    for name, collect, show in charts:
+        fig_path = f'{repo_root()}/tests/{name}.png'
+        with stage(f'{name}.collect'):
+            data = collect()
+            digest = progress_digest(data)
+        if digest == get_render_digest(name) and os.path.exists(fig_path):
+            continue
+        with stage(f'{name}.build'):
+            fig = show(data)
+        with stage(f'{name}.savefig'):
+            fig.savefig(fig_path)
+        # Освобождаем artist'ы сразу, не дожидаясь сборщика циклических ссылок
+        fig.clear()
+        rendered.append((name, fig_path, digest))
+    return rendered
+
+
+def update_progress_charts():
+    """
+    Перерисовывает графики прогресса и фиксирует их в Git одним коммитом.
+    Графики, данные которых не изменились с прошлой отрисовки, не строятся и не коммитятся.
+    Хэш данных сохраняется только после успешного коммита. Возвращает список обновленных файлов.
+    """
+    rendered = render_progress_charts()
+    if not rendered:
+        return []
+    # Коммитим графики отдельным коммитом
+    with stage('git_commit'):
+        ok, msg = commit_paths("Обновлены графики прогресса", [fig_path for _, fig_path, _ in rendered])
+    if not ok:
+        raise RuntimeError(msg)
+    for name, _, digest in rendered:
+        set_render_digest(name, digest)
+    return [fig_path for _, fig_path, _ in rendered]
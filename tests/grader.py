@@ -0,0 +1,288 @@
+"""
+Пакетная проверка всех заданий.
+
+Находит скрипты заданий по каталогу (tests/catalog.py), запускает их параллельно в отдельных
+процессах (tests/task_runner.py) с ограничением времени и памяти на каждый скрипт и собирает ответы
+вместе с потреблением ресурсов (пиковый RSS и процессорное время, на Linux/macOS).
+Затем одной транзакцией записывает все вердикты в result.db, переименовывает файлы заданий,
+один раз перерисовывает графики прогресса и делает один коммит.
+
+Запуск из корня репозитория:
+    python -m tests.grader
+    python -m tests.grader --topic 2 --jobs 4 --timeout 30
+    python -m tests.grader --memory-mb 512 --cpu-seconds 10
+    python -m tests.grader --dry-run      # только запустить и показать вердикты
+"""
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from tests import catalog, solution_cache
+from tests.storage import repo_root, add_results, get_last_result, set_render_digest
+from tests.rename_worker import resolve_moves, apply_moves, batch_commit_message
+from tests.git_writer import commit_paths, git_lock
+from tests.task_runner import profile_enabled
+from tests.runtime import maxrss_mb
+
+TIMEOUT = 'Превышено время'
+RESOURCE_LIMIT = 'Превышены ресурсы'
+ERROR = 'Ошибка'
+NO_ANSWER = 'Нет ответа'
+DEFAULT_MEMORY_MB = 2048
+
+
+def run_child(command, cwd, env, timeout):
+    """
+    Запускает процесс и ждет его не дольше timeout секунд.
+    Возвращает (код возврата или None при таймауте, stdout, stderr, пиковый RSS в МБ, процессорное время в с).
+    На Linux/macOS потребление берется из os.wait4 по этому процессу; на Windows оно не замеряется (None).
+    """
+    if not hasattr(os, 'wait4'):
+        try:
+            result = subprocess.run(command, cwd=cwd, env=env, stdin=subprocess.DEVNULL, capture_output=True,
+                                    text=True, encoding='utf-8', errors='replace', timeout=timeout)
+        except subprocess.TimeoutExpired:
+            return None, '', '', None, None
+        return result.returncode, result.stdout, result.stderr, None, None
+
+    # Вывод — во временные файлы: os.wait4 ждет процесс, не читая каналы, и полный канал не должен его блокировать
+    with tempfile.TemporaryFile() as out, tempfile.TemporaryFile() as err:
+        process = subprocess.Popen(command, cwd=cwd, env=env, stdin=subprocess.DEVNULL, stdout=out, stderr=err)
+        timed_out = threading.Event()
+
+        def kill():
+            timed_out.set()
+            process.kill()
+
+        timer = threading.Timer(timeout, kill)
+        timer.start()
+        try:
+            _, status, usage = os.wait4(process.pid, 0)
+        finally:
+            timer.cancel()
+        process.returncode = os.waitstatus_to_exitcode(status)
+
+        out.seek(0)
+        err.seek(0)
+        stdout = out.read().decode('utf-8', errors='replace')
+        stderr = err.read().decode('utf-8', errors='replace')
+
+    cpu_seconds = usage.ru_utime + usage.ru_stime
+    return (None if timed_out.is_set() else process.returncode), stdout, stderr, maxrss_mb(usage), cpu_seconds
+
+
+def runner_command(script_path, memory_mb=None, cpu_seconds=None, stub_turtle=False):
+    command = [sys.executable, '-m', 'tests.task_runner', script_path]
+    if memory_mb:
+        command += ['--memory-mb', str(memory_mb)]
+    if cpu_seconds:
+        command += ['--cpu-seconds', str(cpu_seconds)]
+    if stub_turtle:
+        command.append('--stub-turtle')
+    return command
+
+
+def runner_env():
+    env = dict(os.environ, PYTHONPATH=repo_root(), MPLBACKEND='Agg')
+    # Скрипты и так выполняются параллельно; потоки OpenBLAS numpy резервируют адресное пространство
+    # и на многоядерной машине упираются в лимит памяти еще при импорте
+    env.setdefault('OPENBLAS_NUM_THREADS', '1')
+    return env
+
+
+def run_task(script_path, timeout, use_cache=True, memory_mb=None, cpu_seconds=None):
+    """
+    Запускает скрипт задания в отдельном процессе. Возвращает отчет task_runner,
+    дополненный полями verdict, wall (время с учетом запуска интерпретатора), cached,
+    peak_rss_mb и cpu_seconds (потребление процесса; None, если не замерялось).
+    memory_mb и cpu_seconds — лимиты памяти и процессорного времени (setrlimit, только Linux/macOS).
+    Если неизмененный скрипт уже выполнялся этой версией Python, результат берется из кэша.
+    """
+    started = time.perf_counter()
+    # Профилирование (EGE_PROFILE) требует настоящего запуска, а замеры под профилировщиком не кэшируются
+    use_cache = use_cache and not profile_enabled()
+    if use_cache:
+        report = solution_cache.lookup(script_path)
+        if report is not None:
+            report['verdict'] = verdict(report)
+            report['wall'] = time.perf_counter() - started
+            report['cached'] = True
+            return report
+        # Хэш берется до запуска: если файл изменят во время выполнения, результат не припишется новой версии
+        try:
+            digest = solution_cache.source_hash(script_path)
+        except OSError:
+            digest = None
+
+    command = runner_command(script_path, memory_mb, cpu_seconds)
+    # Рабочая папка — папка задания: скрипты открывают файлы данных по относительному пути
+    returncode, stdout, stderr, peak_rss_mb, cpu_used = run_child(command, os.path.dirname(script_path),
+                                                                  runner_env(), timeout)
+    wall = time.perf_counter() - started
+    usage = {'wall': wall, 'cached': False, 'peak_rss_mb': peak_rss_mb, 'cpu_seconds': cpu_used}
+
+    if returncode is None:
+        return dict({'script': script_path, 'calls': [], 'answer': None, 'error': None,
+                     'limit_exceeded': False, 'verdict': TIMEOUT}, **usage)
+
+    try:
+        report = json.loads(stdout.strip().splitlines()[-1])
+    except (IndexError, ValueError):
+        stderr_lines = stderr.strip().splitlines()
+        # Процесс убит по жесткому лимиту CPU, не успев записать отчет
+        killed_by_limit = bool(cpu_seconds) and os.name != 'nt' and (
+            returncode == -signal.SIGXCPU or (returncode == -signal.SIGKILL and (cpu_used or 0) >= cpu_seconds))
+        report = {'script': script_path, 'calls': [], 'answer': None, 'limit_exceeded': killed_by_limit,
+                  'error': stderr_lines[-1] if stderr_lines else f"код возврата {returncode}"}
+
+    if use_cache and digest:
+        solution_cache.store(script_path, report, digest)
+    report.update(usage)
+    report['verdict'] = verdict(report)
+    return report
+
+
+def verdict(report):
+    if report['calls']:
+        return "Верно" if all(c['correct'] for c in report['calls']) else "Неверно"
+    if report.get('limit_exceeded'):
+        return RESOURCE_LIMIT
+    if report['error']:
+        return ERROR
+    return NO_ANSWER
+
+
+def run_all(scripts, jobs, timeout, use_cache=True, memory_mb=None, cpu_seconds=None):
+    """Запускает скрипты в jobs параллельных процессах; отчеты возвращаются в порядке scripts."""
+    # Потоки только ждут дочерние процессы; каждый скрипт выполняется в своем процессе,
+    # поэтому зависший скрипт можно остановить по таймауту, не трогая остальные
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(lambda script: run_task(script, timeout, use_cache, memory_mb, cpu_seconds), scripts))
+
+
+def apply_verdicts(reports):
+    """
+    Записывает вердикты одной транзакцией, переименовывает файлы заданий, перерисовывает графики
+    и фиксирует все одним коммитом. Возвращает (добавлено записей в БД, результат коммита).
+    Вердикт неизмененного скрипта (результат из кэша), совпадающий с последней записанной попыткой,
+    повторно не записывается: иначе каждый запуск проверки добавлял бы ту же попытку еще раз.
+    """
+    from tests.conftest import find_task_files, status_commit_message, render_progress_charts
+
+    now = datetime.now().isoformat()
+    rows = []
+    calls = []
+    for report in reports:
+        # Потребление ресурсов — процесса task_runner (время с учетом запуска интерпретатора);
+        # для результата из кэша скрипт не выполнялся, и замеров нет
+        usage = None if report.get('cached') else (report.get('wall'), report.get('cpu_seconds'),
+                                                  report.get('peak_rss_mb'))
+        for call in report['calls']:
+            res = 1 if call['correct'] else 0
+            calls.append((call['number'], call['task_type'], res))
+            if report.get('cached') and get_last_result(call['number'], call['task_type']) == res:
+                continue
+            rows.append((now, call['number'], call['task_type'], res, usage))
+    added = add_results(rows)
+
+    # Переименования и коммит — под блокировкой Git, чтобы фоновый обработчик не вклинился между ними
+    with git_lock:
+        to_add, to_remove, messages = set(), set(), []
+        for number, task_type, res in calls:
+            task_dir, files = find_task_files(task_type, number, res == 1)
+            resolved_moves = resolve_moves(task_dir, files) if files else []
+            if not resolved_moves or not apply_moves(resolved_moves):
+                continue
+            renamed = False
+            for src, dst in resolved_moves:
+                to_add.add(dst)
+                if src != dst:
+                    to_remove.add(src)
+                    renamed = True
+            # Статус в сообщении — только если файлы задания действительно переименованы
+            if renamed:
+                messages.append(status_commit_message(task_type, number, res))
+
+        charts = render_progress_charts()
+        if charts:
+            messages.append("Обновлены графики прогресса")
+        if not messages:
+            return added, (True, "Нет изменений для коммита")
+        result = commit_paths(batch_commit_message(messages), sorted(to_add) + [path for _, path, _ in charts],
+                              sorted(to_remove - to_add))
+        # Хэш графиков — только после коммита, иначе неудачно закоммиченный график не перерисуется
+        if result[0]:
+            for name, _, digest in charts:
+                set_render_digest(name, digest)
+        return added, result
+
+
+def format_usage(report):
+    """Процессорное время и пиковый RSS для строки вердикта (прочерки, если не замерялись)."""
+    cpu, rss = report.get('cpu_seconds'), report.get('peak_rss_mb')
+    cpu = f"{cpu:6.2f} с CPU" if cpu is not None else f"{'-':>6} с CPU"
+    rss = f"{rss:7.1f} МБ" if rss is not None else f"{'-':>7} МБ"
+    return f"{cpu} {rss}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Пакетная проверка заданий')
+    parser.add_argument('--topic', type=int, help='проверить только одну тему')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--timeout', type=float, default=60.0, help='секунд на один скрипт')
+    parser.add_argument('--dry-run', action='store_true', help='не записывать результаты и не коммитить')
+    parser.add_argument('--memory-mb', type=float, default=DEFAULT_MEMORY_MB,
+                        help='лимит памяти на один скрипт, МБ (0 — без лимита)')
+    parser.add_argument('--cpu-seconds', type=float,
+                        help='лимит процессорного времени на один скрипт, с (по умолчанию равен --timeout)')
+    parser.add_argument('--slowest', type=int, default=5)
+    parser.add_argument('--no-cache', action='store_true', help='выполнить все скрипты заново, не используя кэш')
+    args = parser.parse_args()
+
+    catalog.refresh()
+    catalog.print_collisions()
+    scripts = [task['script'] for task in catalog.get_tasks(task_type=args.topic)
+               if task['script'] and task['answer_hash']]
+    if not scripts:
+        print("Скрипты заданий не найдены")
+        return 1
+
+    started = time.perf_counter()
+    cpu_seconds = args.timeout if args.cpu_seconds is None else args.cpu_seconds
+    reports = run_all(scripts, args.jobs, args.timeout, not args.no_cache, args.memory_mb, cpu_seconds)
+    elapsed = time.perf_counter() - started
+
+    for report in reports:
+        rel = os.path.relpath(report['script'], repo_root())
+        detail = report['error'] or ('(из кэша)' if report['cached'] else '')
+        print(f"{report['verdict']:<17} {report['wall']:6.2f} с  {format_usage(report)}  {rel}  {detail}")
+
+    counts = {}
+    for report in reports:
+        counts[report['verdict']] = counts.get(report['verdict'], 0) + 1
+    print()
+    print(', '.join(f"{verdict}: {count}" for verdict, count in sorted(counts.items())))
+    print(f"Скриптов: {len(reports)} за {elapsed:.2f} с ({len(reports) / elapsed:.1f} заданий/с, "
+          f"процессов: {args.jobs}, из кэша: {sum(r['cached'] for r in reports)})")
+    print("Самые медленные:")
+    for report in sorted(reports, key=lambda r: -r['wall'])[:args.slowest]:
+        print(f"  {report['wall']:6.2f} с  {os.path.relpath(report['script'], repo_root())}")
+
+    if args.dry_run:
+        return 0
+    started = time.perf_counter()
+    added, (ok, msg) = apply_verdicts(reports)
+    print(f"Записано результатов: {added}; {msg} ({time.perf_counter() - started:.2f} с)")
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
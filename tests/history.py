@@ -0,0 +1,31 @@
+"""
+Свертка старой истории попыток.
+
+Попытки старше окна хранения удаляются из таблицы test и сохраняются итогами по неделям
+или месяцам в progress_rollup. Факт «задание решено» при этом не теряется: add_result и общий
+график учитывают свернутую историю. Детальный график и без свертки показывает старые даты
+одной строкой «Ранее».
+
+Окно по умолчанию — storage.HISTORY_WINDOW_DAYS дней (или переменная EGE_HISTORY_DAYS).
+
+Запуск из корня репозитория:
+    python -m tests.history
+    python -m tests.history --window-days 60 --period month
+"""
+import argparse
+
+from tests.storage import PERIOD_START_SQL, compact_history, history_cutoff
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Свертка попыток старше окна хранения')
+    parser.add_argument('--window-days', type=int, help='сколько последних дней хранить по дням')
+    parser.add_argument('--period', choices=sorted(PERIOD_START_SQL), default='week')
+    args = parser.parse_args()
+
+    compacted = compact_history(args.window_days, args.period)
+    print(f"Свернуто попыток старше {history_cutoff(args.window_days)}: {compacted} (период: {args.period})")
+
+
+if __name__ == '__main__':
+    main()
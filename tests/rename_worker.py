@@ -1,17 +1,42 @@
 import os
 import time
 import sqlite3
-import subprocess
 import sys
 import json
+import hashlib
+import select
+import socket
 
 # Настройка путей
 def repo_root():
     return os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 
+if repo_root() not in sys.path:
+    sys.path.insert(0, repo_root())
+from tests.git_writer import commit_paths, git_lock
+from tests.trace import stage, flush as flush_trace
+from tests.runtime import runtime_dir, ensure_runtime_dir, owned_socket
+
 DB_PATH = os.path.join(os.path.dirname(__file__), 'rename_queue.db')
 LOCK_FILE = os.path.join(os.path.dirname(__file__), 'worker.lock')
 
+# Сокет для пробуждения обработчика. Путь к репозиторию может быть длиннее допустимого
+# для Unix-сокета, поэтому имя строится по хэшу пути
+SOCKET_PATH = os.path.join(
+    runtime_dir(),
+    f"ege-worker-{hashlib.sha1(repo_root().encode()).hexdigest()[:12]}.sock"
+)
+
+BUSY_WAIT = 1         # пауза после выполненной работы, сек
+IDLE_WAIT = 2         # опрос очереди, если уведомление не пришло (запасной вариант), сек
+MAX_IDLE_CYCLES = 30  # после стольких пустых циклов обработчик завершается
+SETTLE_TIME = 0.1     # серия уведомлений обрабатывается вместе, если паузы между ними короче, сек
+LATENCY_HISTORY = 1000
+SPAWN_GRACE = 5       # столько PID из note_worker_pid считается запускающимся обработчиком, сек
+LOCK_ATTEMPTS = 3     # попытки захвата блокировки: worker_alive держит ее на мгновение при проверке
+
+_lock_file = None     # файл блокировки, если ее держит этот процесс
+
 def get_db():
     conn = sqlite3.connect(DB_PATH)
     # Используем новую таблицу tasks с JSON полем files
@@ -24,155 +49,517 @@ def get_db():
             unique_key TEXT UNIQUE ON CONFLICT REPLACE
         )
     ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS render_requests (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            requested_at REAL
+        )
+    ''')
+    # Время постановки в очередь — для замера задержки «постановка → переименование»
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(tasks)")}
+    if 'queued_at' not in columns:
+        conn.execute("ALTER TABLE tasks ADD COLUMN queued_at REAL")
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS latency (
+            kind TEXT,
+            seconds REAL,
+            finished_at REAL
+        )
+    ''')
+    # Счетчики запусков обработчика и принятых уведомлений (см. --stats)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS counters (
+            name TEXT PRIMARY KEY,
+            value INTEGER
+        )
+    ''')
     return conn
 
-def run_git(args, cwd):
-    flags = 0x08000000 if os.name == 'nt' else 0
+def record_latency(conn, kind, queued_at):
+    """Сохраняет задержку от постановки задачи в очередь до ее выполнения (хранятся последние записи)."""
+    if queued_at is None:
+        return
+    now = time.time()
+    conn.execute("INSERT INTO latency (kind, seconds, finished_at) VALUES (?, ?, ?)", (kind, now - queued_at, now))
+    conn.execute("DELETE FROM latency WHERE rowid <= (SELECT MAX(rowid) FROM latency) - ?", (LATENCY_HISTORY,))
+
+def add_counter(conn, name, value=1):
+    if value:
+        conn.execute("INSERT INTO counters (name, value) VALUES (?, ?) "
+                     "ON CONFLICT (name) DO UPDATE SET value = value + excluded.value", (name, value))
+
+def worker_pid():
+    """PID обработчика из файла блокировки или None."""
     try:
-        subprocess.run(['git'] + args, cwd=cwd, capture_output=True, check=False, creationflags=flags)
-    except Exception:
+        with open(LOCK_FILE) as f:
+            return int(f.read().strip() or 0) or None
+    except (OSError, ValueError):
+        return None
+
+def lock_held():
+    """Держит ли какой-то процесс блокировку обработчика: проверка захватом без ожидания."""
+    # Блокировки lockf принадлежат процессу: закрытие любого открытого здесь файла блокировки
+    # (и при проверке, и при чтении PID) сняло бы собственную блокировку обработчика
+    if _lock_file is not None:
+        return True
+    try:
+        f_lock = open(LOCK_FILE, 'r+')
+    except OSError:
+        return False
+    with f_lock:
+        if not try_lock(f_lock):
+            return True
+        if os.name == 'nt':
+            import msvcrt
+            f_lock.seek(0)
+            msvcrt.locking(f_lock.fileno(), msvcrt.LK_UNLCK, 1)
+        # На POSIX блокировка снимается при закрытии файла
+    return False
+
+def worker_alive():
+    """
+    Работает ли обработчик: кто-то держит блокировку, или обработчик только что запущен и еще
+    не захватил ее. PID из файла блокировки учитывается только первые SPAWN_GRACE секунд после
+    note_worker_pid: позже он может принадлежать постороннему процессу, получившему тот же номер.
+    """
+    if lock_held():
+        return True
+    pid = worker_pid()
+    # На Windows os.kill(pid, 0) завершает процесс, поэтому там проверки нет
+    if pid is None or os.name == 'nt':
+        return False
+    try:
+        if time.time() - os.path.getmtime(LOCK_FILE) > SPAWN_GRACE:
+            return False
+        os.kill(pid, 0)
+    except OSError:
+        # Файла или процесса нет, или PID уже занят процессом другого пользователя
+        return False
+    return True
+
+def note_worker_pid(pid):
+    """Записывает PID запущенного обработчика, пока он сам не захватил блокировку."""
+    try:
+        with open(LOCK_FILE, 'a') as f:
+            f.truncate(0)
+            f.write(str(pid))
+    except OSError:
+        pass
+
+def notify_worker():
+    """
+    Будит запущенный обработчик. Возвращает True, если уведомление принято.
+    Сокет должен принадлежать текущему пользователю, а обработчик — работать (worker_alive):
+    иначе сокет остался от упавшего обработчика, и нужно запустить новый.
+    """
+    if not hasattr(socket, 'AF_UNIX') or not owned_socket(SOCKET_PATH) or not worker_alive():
+        return False
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+            sock.setblocking(False)
+            sock.sendto(b'1', SOCKET_PATH)
+        return True
+    except BlockingIOError:
+        # Очередь уведомлений полна: обработчик жив, просто еще не вычитал прошлые
+        return True
+    except OSError:
+        return False
+
+def open_wakeup_socket():
+    """Открывает сокет, на который приходят уведомления о новых задачах. Без поддержки Unix-сокетов — None."""
+    if not hasattr(socket, 'AF_UNIX') or not ensure_runtime_dir():
+        return None
+    try:
+        # Старый файл сокета остался от завершившегося обработчика: блокировка уже у нас
+        if os.path.exists(SOCKET_PATH):
+            os.remove(SOCKET_PATH)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.bind(SOCKET_PATH)
+        sock.setblocking(False)
+        return sock
+    except OSError:
+        return None
+
+def close_wakeup_socket(sock):
+    if sock is None:
+        return
+    try:
+        sock.close()
+        os.remove(SOCKET_PATH)
+    except OSError:
         pass
 
+# Уведомлений принято за время работы обработчика: каждое — отправка, которой не пришлось его запускать
+_wakeups = 0
+
+def wait_for_wakeup(sock, timeout):
+    """
+    Ждет уведомления не дольше timeout секунд. Возвращает True, если обработчика разбудили.
+    Без сокета просто спит — очередь тогда опрашивается по таймеру.
+    """
+    if sock is None:
+        time.sleep(timeout)
+        return False
+    global _wakeups
+    if not select.select([sock], [], [], timeout)[0]:
+        return False
+    # Серия отправок приходит пачкой: ждем, пока уведомления не затихнут, чтобы обработать их вместе
+    deadline = time.monotonic() + BUSY_WAIT
+    while True:
+        try:
+            while sock.recv(64):
+                _wakeups += 1
+        except OSError:
+            pass
+        if time.monotonic() >= deadline or not select.select([sock], [], [], SETTLE_TIME)[0]:
+            return True
+
+def batch_commit_message(messages):
+    """Одно сообщение коммита для всех изменений статуса, собранных за цикл обработки."""
+    messages = list(dict.fromkeys(messages))
+    if not messages:
+        return "Автоматическое обновление статуса заданий"
+    if len(messages) == 1:
+        return messages[0]
+    return f"Обновлен статус заданий: {len(messages)}\n\n" + "\n".join(f"- {m}" for m in messages)
+
+# Префиксы статуса задания в порядке приоритета при поиске файла
+PREFIXES = ['', '+', '-']
+
+def scan_task_dir(task_dir):
+    """
+    Один проход os.scandir по папке заданий вместо проверки каждого имени через os.path.exists.
+    Возвращает {имя без префикса: [найденные префиксы в порядке PREFIXES]} или None, если папки нет.
+    """
+    index = {}
+    try:
+        with os.scandir(task_dir) as entries:
+            for entry in entries:
+                name = entry.name
+                prefix = name[0] if name[:1] in ('+', '-') else ''
+                index.setdefault(name[len(prefix):], []).append(prefix)
+    except OSError:
+        return None
+    for prefixes in index.values():
+        prefixes.sort(key=PREFIXES.index)
+    return index
+
+def resolve_moves(task_dir, files, index=None):
+    """
+    Возвращает список (текущий путь, целевой путь) для файлов задачи, которые удалось найти.
+    index — результат scan_task_dir(task_dir), если он уже построен.
+    """
+    if index is None:
+        index = scan_task_dir(task_dir) or {}
+    resolved_moves = []
+    
+    for f in files:
+        base_name = f['base']
+        target_name = f['target']
+        target_prefix = target_name[:len(target_name) - len(base_name)]
+        
+        target_path = os.path.join(task_dir, target_name)
+        prefixes = index.get(base_name, [])
+        
+        if target_prefix in prefixes and target_name.endswith(base_name):
+            current_path = target_path
+        elif prefixes:
+            current_path = os.path.join(task_dir, prefixes[0] + base_name)
+        else:
+            # File not found. Skip it.
+            continue
+            
+        resolved_moves.append((current_path, target_path))
+    return resolved_moves
+
+def apply_moves(resolved_moves):
+    """Переименовывает файлы задачи. При ошибке откатывает уже сделанное и возвращает False."""
+    # Check & Rename Phase (Atomic-like)
+    completed_renames = []
+    
+    for src, dst in resolved_moves:
+        if src == dst:
+            continue
+        
+        try:
+            # If target exists (and it's not src), remove it (cleanup old garbage)
+            if os.path.exists(dst):
+                 try: os.remove(dst)
+                 except: pass
+
+            os.rename(src, dst)
+            completed_renames.append((src, dst))
+        except Exception:
+            # File Locked! Rollback everything.
+            for done_src, done_dst in reversed(completed_renames):
+                try:
+                    # Rename dst back to src
+                    if os.path.exists(done_dst):
+                        os.rename(done_dst, done_src)
+                except:
+                    pass
+            return False
+    return True
+
 def process_queue():
+    """
+    Обрабатывает всю очередь за один проход: переименовывает файлы всех задач,
+    добавляет все целевые пути одним git add, делает один коммит со списком изменений
+    и удаляет обработанные строки одной транзакцией.
+    Возвращает True, если хотя бы одна задача выполнена или снята из очереди: задачи,
+    файлы которых все еще заняты, работой не считаются и не мешают отрисовке графиков.
+    """
     try:
         conn = get_db()
         cursor = conn.cursor()
         
-        cursor.execute("SELECT id, task_dir, files, commit_msg FROM tasks")
+        cursor.execute("SELECT id, task_dir, files, commit_msg, queued_at FROM tasks ORDER BY id")
         rows = cursor.fetchall()
         
         if not rows:
             conn.close()
             return False
 
+        done = []          # (row_id, queued_at) — строки, которые можно удалить из очереди
+        to_add = set()     # целевые пути для коммита
+        to_remove = set()  # прежние имена переименованных файлов
+        messages = []   # сообщения об изменении статуса для общего коммита
+        dir_index = {}  # task_dir -> scan_task_dir(task_dir), одно сканирование папки на цикл
+
         for row in rows:
-            row_id, task_dir, files_json, commit_msg = row
+            row_id, task_dir, files_json, commit_msg, queued_at = row
             try:
                 files = json.loads(files_json) # [{'base': '...', 'target': '...'}, ...]
             except:
                 # Corrupt data, delete
-                cursor.execute("DELETE FROM tasks WHERE id=?", (row_id,))
-                conn.commit()
+                done.append((row_id, None))
                 continue
             
-            # 1. Resolving paths
-            resolved_moves = []
-            
-            for f in files:
-                base_name = f['base']
-                target_name = f['target']
-                
-                target_path = os.path.join(task_dir, target_name)
-                current_path = None
-                
-                if os.path.exists(target_path):
-                    current_path = target_path
-                else:
-                    for prefix in ['', '+', '-']:
-                        p = os.path.join(task_dir, prefix + base_name)
-                        if os.path.exists(p):
-                            current_path = p
-                            break
-                
-                if not current_path:
-                    # File not found. Skip it.
-                    continue
-                    
-                resolved_moves.append((current_path, target_path))
-
+            if task_dir not in dir_index:
+                dir_index[task_dir] = scan_task_dir(task_dir) or {}
+            resolved_moves = resolve_moves(task_dir, files, dir_index[task_dir])
             if not resolved_moves:
                 # No files found at all. Delete task.
-                cursor.execute("DELETE FROM tasks WHERE id=?", (row_id,))
-                conn.commit()
+                done.append((row_id, None))
                 continue
             
-            # 2. Check & Rename Phase (Atomic-like)
-            completed_renames = []
-            abort = False
-            
-            for src, dst in resolved_moves:
-                if src == dst:
-                    continue
-                
-                try:
-                    # If target exists (and it's not src), remove it (cleanup old garbage)
-                    if os.path.exists(dst):
-                         try: os.remove(dst)
-                         except: pass
-
-                    os.rename(src, dst)
-                    completed_renames.append((src, dst))
-                except OSError:
-                    # File Locked! Abort everything.
-                    abort = True
-                    break
-                except Exception:
-                    abort = True
-                    break
-            
-            if abort:
-                # Rollback!
-                for src, dst in reversed(completed_renames):
-                    try:
-                        # Rename dst back to src
-                        if os.path.exists(dst):
-                            os.rename(dst, src)
-                    except:
-                        pass
+            with stage('apply_moves'):
+                moved = apply_moves(resolved_moves)
+            # Содержимое папки могло измениться — следующая задача из нее пересканирует папку
+            dir_index.pop(task_dir, None)
+            if not moved:
                 # Do NOT delete from queue. Wait for next cycle.
                 continue
 
-            # 3. Git Phase (Success)
             # Add all target paths (even those that didn't need rename)
-            # We add all 'target_path' from resolved_moves just in case
-            to_add = set()
+            renamed = False
             for src, dst in resolved_moves:
                 to_add.add(dst)
-            
-            if to_add:
-                for path in to_add:
-                    run_git(['add', path], repo_root())
-                run_git(['commit', '-m', commit_msg], repo_root())
-            
-            cursor.execute("DELETE FROM tasks WHERE id=?", (row_id,))
-            conn.commit()
+                if src != dst:
+                    to_remove.add(src)
+                    renamed = True
+            # Статус в сообщении — только если файлы задачи действительно переименованы
+            if renamed:
+                messages.append(commit_msg)
+            done.append((row_id, queued_at))
+
+        # Git Phase: one commit for the whole drain cycle (fast-import with EGE_FAST_COMMIT=1)
+        if to_add:
+            with stage('git_commit'):
+                ok, msg = commit_paths(batch_commit_message(messages), sorted(to_add), sorted(to_remove - to_add))
+            if not ok:
+                # Файлы уже переименованы, но коммит не создан: задачи остаются в очереди, и в следующем
+                # проходе src совпадет с dst — останется только повторить коммит. Снимаем лишь пустые задачи
+                print(f"Ошибка коммита: {msg}")
+                done = [(row_id, queued_at) for row_id, queued_at in done if queued_at is None]
+
+        cursor.executemany("DELETE FROM tasks WHERE id=?", [(row_id,) for row_id, _ in done])
+        for _, queued_at in done:
+            record_latency(conn, 'rename', queued_at)
+        conn.commit()
                 
         conn.close()
-        return True
+        return bool(done)
     except Exception:
         return False
 
-def main():
-    f_lock = open(LOCK_FILE, 'w')
+def process_render_queue():
+    """
+    Перерисовывает графики прогресса, если об этом просили. Все накопившиеся запросы дают одну отрисовку.
+    Если отрисовка не удалась, запрос возвращается в очередь и повторяется в следующем цикле.
+    """
+    try:
+        conn = get_db()
+        row = conn.execute("SELECT requested_at FROM render_requests").fetchone()
+        if not row:
+            conn.close()
+            return False
+        # Снимаем запрос до отрисовки: результаты, записанные после этого момента, запросят её снова
+        conn.execute("DELETE FROM render_requests")
+        conn.commit()
+    except Exception:
+        return False
+
+    try:
+        from tests.conftest import update_progress_charts
+        update_progress_charts()
+    except Exception:
+        # Возвращаем запрос с прежним временем, если за время отрисовки не пришел новый
+        try:
+            conn.execute("INSERT OR IGNORE INTO render_requests (id, requested_at) VALUES (1, ?)", (row[0],))
+            conn.commit()
+        except Exception:
+            pass
+        conn.close()
+        return False
+    try:
+        record_latency(conn, 'render', row[0])
+        conn.commit()
+    except Exception:
+        pass
+    conn.close()
+    return True
+
+def has_pending_work(since=None):
+    """
+    Есть ли задачи в очереди. С since учитываются только задачи, поставленные не раньше этого
+    момента: те, что уже не удались обработчику (файл занят), не держат его запущенным.
+    """
+    try:
+        conn = get_db()
+        if since is None:
+            pending = (conn.execute("SELECT 1 FROM tasks LIMIT 1").fetchone()
+                       or conn.execute("SELECT 1 FROM render_requests").fetchone())
+        else:
+            pending = (conn.execute("SELECT 1 FROM tasks WHERE queued_at >= ? LIMIT 1", (since,)).fetchone()
+                       or conn.execute("SELECT 1 FROM render_requests WHERE requested_at >= ?", (since,)).fetchone())
+        conn.close()
+        return bool(pending)
+    except Exception:
+        return False
+
+def print_stats():
+    """Печатает задержки «постановка в очередь → выполнение» по последним задачам и счетчики запусков."""
+    conn = get_db()
+    for kind, title in (('rename', 'Переименование'), ('render', 'Графики')):
+        values = sorted(r[0] for r in conn.execute("SELECT seconds FROM latency WHERE kind = ?", (kind,)))
+        if not values:
+            print(f"{title}: нет данных")
+            continue
+        p50 = values[len(values) // 2]
+        p95 = values[min(len(values) - 1, int(len(values) * 0.95))]
+        print(f"{title}: {len(values)} задач, p50 {p50 * 1000:.0f} мс, p95 {p95 * 1000:.0f} мс, "
+              f"макс {values[-1] * 1000:.0f} мс")
+    counters = dict(conn.execute("SELECT name, value FROM counters"))
+    print(f"Запуски обработчика: {counters.get('started', 0)}, лишние (обработчик уже работал): "
+          f"{counters.get('duplicate', 0)}, отправок без запуска (принято уведомлений): {counters.get('wakeups', 0)}")
+    conn.close()
+
+def record_counters(**values):
+    try:
+        conn = get_db()
+        for name, value in values.items():
+            add_counter(conn, name, value)
+        conn.commit()
+        conn.close()
+    except Exception:
+        pass
+
+def try_lock(f_lock):
+    """Захватывает блокировку на открытом файле без ожидания. Возвращает True при успехе."""
     try:
         if os.name == 'nt':
             import msvcrt
+            f_lock.seek(0)
             msvcrt.locking(f_lock.fileno(), msvcrt.LK_NBLCK, 1)
         else:
             import fcntl
             fcntl.lockf(f_lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
     except (IOError, OSError):
-        return
+        return False
+    return True
 
+def acquire_lock():
+    """
+    Захватывает блокировку единственного обработчика и записывает в файл свой PID.
+    Возвращает файл блокировки или None.
+    """
+    global _lock_file
+    # Без усечения при открытии: иначе лишний процесс стер бы PID работающего обработчика
+    f_lock = open(LOCK_FILE, 'a+')
+    for attempt in range(LOCK_ATTEMPTS):
+        if try_lock(f_lock):
+            break
+        if attempt + 1 < LOCK_ATTEMPTS:
+            time.sleep(0.05)
+    else:
+        f_lock.close()
+        return None
+    f_lock.truncate(0)
+    f_lock.write(str(os.getpid()))
+    f_lock.flush()
+    _lock_file = f_lock
+    return f_lock
+
+def release_lock(f_lock):
+    global _lock_file
+    _lock_file = None
+    try:
+        f_lock.close()
+        os.remove(LOCK_FILE)
+    except:
+        pass
+
+def run_loop(sock):
+    """Обрабатывает очередь, пока она не простаивает MAX_IDLE_CYCLES циклов. Возвращает время последней проверки."""
     idle_count = 0
     while True:
-        worked = process_queue()
+        checked_at = time.time()
+        # Переименование и коммит — под общей блокировкой Git, чтобы не пересекаться с другими процессами
+        with git_lock:
+            worked = process_queue()
+        flush_trace('rename')
+        if not worked:
+            # Графики строим только когда очередь переименований пуста — так серия отправок даст одну отрисовку
+            worked = process_render_queue()
+            flush_trace('render')
         
+        # Новая задача будит обработчик сразу, таймаут — только запасной опрос
         if worked:
             idle_count = 0
-            time.sleep(1)
+            wait_for_wakeup(sock, BUSY_WAIT)
+        elif wait_for_wakeup(sock, IDLE_WAIT):
+            idle_count = 0
         else:
             idle_count += 1
-            time.sleep(2)
-            
-        if idle_count > 30:
-            break
             
-    try:
-        f_lock.close()
-        os.remove(LOCK_FILE)
-    except:
-        pass
+        if idle_count > MAX_IDLE_CYCLES:
+            return checked_at
+
+def main():
+    global _wakeups
+    started = 1  # повторный круг после проверки очереди — тот же запуск
+    while True:
+        f_lock = acquire_lock()
+        if f_lock is None:
+            record_counters(duplicate=started)
+            return
+        sock = open_wakeup_socket()
+        checked_at = None
+        _wakeups = 0
+        try:
+            checked_at = run_loop(sock)
+        finally:
+            close_wakeup_socket(sock)
+            release_lock(f_lock)
+            record_counters(started=started, wakeups=_wakeups)
+            started = 0
+        # Задача могла прийти между последней проверкой очереди и снятием блокировки
+        if not has_pending_work(checked_at):
+            return
 
 if __name__ == "__main__":
-    main()
+    if '--stats' in sys.argv[1:]:
+        print_stats()
+    else:
+        main()
@@ -0,0 +1,80 @@
+"""
+Папка для Unix-сокетов фонового обработчика и прогретого запуска (tests/warm_runner.py).
+
+Сокеты лежат в $XDG_RUNTIME_DIR, а без него — в ege-<uid> во временной папке с правами 0700.
+В общей /tmp чужой процесс мог бы занять имя сокета, слушать на нем или подключиться к серверу.
+Здесь же — пересчет замеров ресурсов процессов (getrusage/wait4).
+"""
+import os
+import socket
+import stat
+import struct
+import sys
+
+
+def runtime_dir():
+    """$XDG_RUNTIME_DIR или ege-<uid> во временной папке."""
+    base = os.environ.get('XDG_RUNTIME_DIR')
+    if base and os.path.isdir(base):
+        return base
+    name = f"ege-{os.getuid()}" if hasattr(os, 'getuid') else 'ege'
+    return os.path.join(os.environ.get('TMPDIR', '/tmp'), name)
+
+
+def ensure_runtime_dir(create=True):
+    """
+    Проверяет папку runtime_dir() (create=True — создает ее с правами 0700). Возвращает True,
+    если папка принадлежит текущему пользователю и закрыта для остальных.
+    """
+    path = runtime_dir()
+    if create:
+        try:
+            os.mkdir(path, 0o700)
+        except FileExistsError:
+            pass
+        except OSError:
+            return False
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+    if not stat.S_ISDIR(st.st_mode):
+        return False
+    if not hasattr(os, 'getuid'):
+        return True
+    return st.st_uid == os.getuid() and not st.st_mode & 0o077
+
+
+def owned_socket(path):
+    """True, если path — сокет текущего пользователя в проверенной папке runtime_dir()."""
+    if not ensure_runtime_dir(create=False):
+        return False
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+    return stat.S_ISSOCK(st.st_mode) and (not hasattr(os, 'getuid') or st.st_uid == os.getuid())
+
+
+def peer_uid(sock):
+    """uid процесса на другом конце Unix-сокета (SO_PEERCRED, Linux) или None, если ОС его не сообщает."""
+    if not hasattr(socket, 'SO_PEERCRED'):
+        return None
+    try:
+        creds = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize('3i'))
+    except OSError:
+        return None
+    return struct.unpack('3i', creds)[1]
+
+
+def trusted_peer(sock, path):
+    """Подключение — к процессу текущего пользователя: по SO_PEERCRED, а без него — по владельцу файла сокета."""
+    uid = peer_uid(sock)
+    if uid is None:
+        return owned_socket(path)
+    return uid == os.getuid()
+
+
+def maxrss_mb(usage):
+    """Пиковый RSS в МБ из результата getrusage/wait4: ru_maxrss — в килобайтах на Linux и в байтах на macOS."""
+    return usage.ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
@@ -0,0 +1,129 @@
+"""
+Кэш результатов решений.
+
+Отчет task_runner (ответы, переданные в result_register, и время выполнения) сохраняется
+с ключом «хэш исходного кода скрипта + версия Python». Пакетная проверка и режим наблюдения
+берут результат из кэша и не запускают неизмененный скрипт повторно. Кэшируются только
+запуски без ошибок и таймаутов.
+
+Хранится в tests/solution_cache.db (не в result.db: кэш зависит от машины и не коммитится).
+Размер ограничен MAX_ENTRIES записями, при переполнении удаляются давно не использованные.
+Файлы данных, которые читает скрипт, в ключ не входят: если они изменились, кэш скрипта
+нужно сбросить явно.
+
+Запуск из корня репозитория:
+    python -m tests.solution_cache                       # статистика
+    python -m tests.solution_cache --invalidate "Тема 5/Задания/Задание 5.py"
+    python -m tests.solution_cache --clear
+"""
+import argparse
+import hashlib
+import json
+import os
+import platform
+import sqlite3
+import sys
+import time
+
+DB_PATH = os.path.join(os.path.dirname(__file__), 'solution_cache.db')
+MAX_ENTRIES = 1000
+
+
+def get_db():
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS solutions (
+            source_hash TEXT,
+            python TEXT,
+            script TEXT,
+            report TEXT,
+            seconds REAL,
+            last_used REAL,
+            PRIMARY KEY (source_hash, python)
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS solutions_last_used ON solutions (last_used)')
+    return conn
+
+
+def python_version():
+    # Версия интерпретатора, которым запускаются скрипты (тот же, что выполняет проверку)
+    return f"{platform.python_implementation()} {platform.python_version()}"
+
+
+def source_hash(script_path):
+    with open(script_path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def lookup(script_path):
+    """Возвращает сохраненный отчет для текущего содержимого скрипта или None."""
+    try:
+        digest = source_hash(script_path)
+        with get_db() as conn:
+            row = conn.execute('SELECT report FROM solutions WHERE source_hash = ? AND python = ?',
+                               (digest, python_version())).fetchone()
+            if row is None:
+                return None
+            conn.execute('UPDATE solutions SET last_used = ?, script = ? WHERE source_hash = ? AND python = ?',
+                         (time.time(), os.path.abspath(script_path), digest, python_version()))
+    except (OSError, sqlite3.Error):
+        return None
+    report = json.loads(row[0])
+    # Файл мог быть переименован (+/-) после того, как результат попал в кэш
+    report['script'] = script_path
+    return report
+
+
+def store(script_path, report, digest=None, max_entries=MAX_ENTRIES):
+    """
+    Сохраняет отчет task_runner. digest — хэш исходника на момент запуска (если файл могли изменить,
+    пока скрипт выполнялся, его нужно взять до запуска). Отчеты с ошибкой не сохраняются.
+    """
+    if report.get('error'):
+        return
+    try:
+        digest = digest or source_hash(script_path)
+        with get_db() as conn:
+            conn.execute('INSERT OR REPLACE INTO solutions VALUES (?, ?, ?, ?, ?, ?)',
+                         (digest, python_version(), os.path.abspath(script_path),
+                          json.dumps(report, ensure_ascii=False), report.get('seconds'), time.time()))
+            # Вытесняем давно не использованные записи сверх лимита
+            conn.execute('''DELETE FROM solutions WHERE rowid IN (
+                                SELECT rowid FROM solutions ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                            )''', (max_entries,))
+    except (OSError, sqlite3.Error) as e:
+        print(f"Ошибка при сохранении результата в кэш: {e}")
+
+
+def invalidate(script_path=None):
+    """Удаляет результаты скрипта (по пути, с любым префиксом статуса) или весь кэш. Возвращает число записей."""
+    with get_db() as conn:
+        if script_path is None:
+            return conn.execute('DELETE FROM solutions').rowcount
+        task_dir, name = os.path.split(os.path.abspath(script_path))
+        base = name.lstrip('+-')
+        paths = [os.path.join(task_dir, prefix + base) for prefix in ('', '+', '-')]
+        return conn.execute(f'DELETE FROM solutions WHERE script IN ({", ".join("?" * len(paths))})',
+                            paths).rowcount
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Кэш результатов решений')
+    parser.add_argument('--invalidate', metavar='SCRIPT', help='сбросить результаты скрипта')
+    parser.add_argument('--clear', action='store_true', help='очистить кэш')
+    args = parser.parse_args()
+
+    if args.clear:
+        print(f"Удалено записей: {invalidate()}")
+    elif args.invalidate:
+        print(f"Удалено записей: {invalidate(args.invalidate)}")
+    else:
+        with get_db() as conn:
+            count, seconds = conn.execute('SELECT COUNT(*), SUM(seconds) FROM solutions').fetchone()
+        print(f"Записей: {count} из {MAX_ENTRIES}; сэкономлено на одном проходе: {seconds or 0:.1f} с")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
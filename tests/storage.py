@@ -0,0 +1,562 @@
+import atexit
+import os
+import sqlite3
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+
+def repo_root():
+    # Корень репозитория — родительская папка для tests/
+    return os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def db_path():
+    # БД всегда в tests/result.db относительно корня репозитория (для бенчмарков путь можно переопределить)
+    return os.environ.get('EGE_RESULT_DB') or os.path.join(repo_root(), 'tests', 'result.db')
+
+
+def result_date(date_time):
+    """Возвращает дату попытки в виде 'YYYY-MM-DD' (ISO-строка или timestamp для обратной совместимости)."""
+    try:
+        return datetime.fromisoformat(str(date_time)).date().isoformat()
+    except Exception:
+        try:
+            return datetime.fromtimestamp(float(date_time)).date().isoformat()
+        except Exception:
+            return None
+
+
+def register_progress(cursor, date_time, task_number, task_type, result):
+    """Учитывает одну попытку в сводных таблицах прогресса."""
+    # Нормализация результата к 0/1, некорректные значения пропускаем
+    try:
+        r = 1 if int(result) == 1 else 0
+        task_type = int(task_type)
+        task_number = int(task_number)
+    except Exception:
+        return
+    day = result_date(date_time)
+    if day is None:
+        return
+
+    cursor.execute('''INSERT INTO progress_daily (task_type, day, task_number, attempts, correct)
+                      VALUES (?, ?, ?, 1, ?)
+                      ON CONFLICT (task_type, day, task_number)
+                      DO UPDATE SET attempts = attempts + 1, correct = correct + excluded.correct''',
+                   (task_type, day, task_number, r))
+    if r:
+        cursor.execute('INSERT OR IGNORE INTO progress_solved (task_type, task_number) VALUES (?, ?)',
+                       (task_type, task_number))
+
+    # Окно последних 5 дат для типа задания
+    cursor.execute('INSERT OR IGNORE INTO progress_recent_dates (task_type, day) VALUES (?, ?)',
+                   (task_type, day))
+    cursor.execute('''DELETE FROM progress_recent_dates
+                      WHERE task_type = ? AND day NOT IN (
+                          SELECT day FROM progress_recent_dates WHERE task_type = ? ORDER BY day DESC LIMIT 5
+                      )''',
+                   (task_type, task_type))
+
+
+# Дата попытки в SQL: ISO-строка или timestamp (для обратной совместимости)
+DAY_SQL = '''CASE WHEN typeof(date_time) IN ('integer', 'real')
+                     THEN date(date_time, 'unixepoch', 'localtime')
+                     ELSE date(date_time) END'''
+
+# Замеры ресурсов попытки (миграция 8), в порядке аргумента usage функций add_result/add_results
+USAGE_COLUMNS = ('wall_seconds', 'cpu_seconds', 'peak_rss_mb')
+
+# Было ли задание решено верно: в сырых попытках или в свернутой истории
+SOLVED_SQL = '''SELECT 1 FROM test WHERE task_type = ? AND task_number = ? AND result = 1
+                UNION ALL
+                SELECT 1 FROM progress_rollup WHERE task_type = ? AND task_number = ? AND correct > 0
+                LIMIT 1'''
+
+
+def rebuild_progress_tables(connection):
+    """Пересчитывает сводные таблицы прогресса по всей таблице test (агрегирует средствами SQLite)."""
+    cursor = connection.cursor()
+    cursor.execute('DELETE FROM progress_daily')
+    cursor.execute('DELETE FROM progress_solved')
+    cursor.execute('DELETE FROM progress_recent_dates')
+    # Дата — ISO-строка или timestamp (для обратной совместимости), строки с неразборчивой датой пропускаются
+    cursor.execute('''INSERT INTO progress_daily (task_type, day, task_number, attempts, correct)
+                      SELECT task_type, day, task_number, COUNT(*), SUM(r)
+                      FROM (
+                          SELECT CAST(task_type AS INTEGER) AS task_type,
+                                 CAST(task_number AS INTEGER) AS task_number,
+                                 ''' + DAY_SQL + ''' AS day,
+                                 CASE WHEN CAST(result AS INTEGER) = 1 THEN 1 ELSE 0 END AS r
+                          FROM test
+                      )
+                      WHERE day IS NOT NULL
+                      GROUP BY task_type, day, task_number''')
+    cursor.execute('''INSERT INTO progress_solved (task_type, task_number)
+                      SELECT DISTINCT task_type, task_number FROM progress_daily WHERE correct > 0''')
+    # Свернутая история (миграция 7) тоже учитывается; при миграции 2 этой таблицы еще нет
+    if cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'progress_rollup'").fetchone():
+        cursor.execute('''INSERT OR IGNORE INTO progress_solved (task_type, task_number)
+                          SELECT task_type, task_number FROM progress_rollup WHERE correct > 0''')
+    cursor.execute('''INSERT INTO progress_recent_dates (task_type, day)
+                      SELECT task_type, day FROM (
+                          SELECT task_type, day, ROW_NUMBER() OVER (PARTITION BY task_type ORDER BY day DESC) AS n
+                          FROM (SELECT DISTINCT task_type, day FROM progress_daily)
+                      )
+                      WHERE n <= 5''')
+
+
+# --- Миграции схемы ---
+# Номер применённой миграции хранится в PRAGMA user_version.
+# Новые миграции только добавляются в конец списка, старые не меняются.
+
+def _migration_1(connection):
+    # Исходная таблица попыток
+    connection.execute('''
+                       CREATE TABLE IF NOT EXISTS test (
+                                                           date_time   DATETIME,
+                                                           task_number BIGINT,
+                                                           task_type   INTEGER,
+                                                           result      INTEGER
+                       )
+                       ''')
+
+
+def _migration_2(connection):
+    """
+    Сводные таблицы прогресса, которые обновляются при каждой вставке в test:
+    - progress_daily: число попыток и верных ответов по (тип, дата, номер задания);
+    - progress_solved: задания, решенные хотя бы раз;
+    - progress_recent_dates: последние 5 дат с попытками для каждого типа.
+    """
+    connection.execute('''
+                       CREATE TABLE IF NOT EXISTS progress_daily (
+                                                           task_type   INTEGER,
+                                                           day         TEXT,
+                                                           task_number BIGINT,
+                                                           attempts    INTEGER,
+                                                           correct     INTEGER,
+                                                           PRIMARY KEY (task_type, day, task_number)
+                       )
+                       ''')
+    connection.execute('''
+                       CREATE TABLE IF NOT EXISTS progress_solved (
+                                                           task_type   INTEGER,
+                                                           task_number BIGINT,
+                                                           PRIMARY KEY (task_type, task_number)
+                       )
+                       ''')
+    connection.execute('''
+                       CREATE TABLE IF NOT EXISTS progress_recent_dates (
+                                                           task_type   INTEGER,
+                                                           day         TEXT,
+                                                           PRIMARY KEY (task_type, day)
+                       )
+                       ''')
+    rebuild_progress_tables(connection)
+
+
+def _migration_3(connection):
+    # Проверка «было ли задание решено» в add_result идет по индексу, а не полным сканированием
+    connection.execute('CREATE INDEX IF NOT EXISTS test_task_result ON test (task_type, task_number, result)')
+
+
+def _migration_4(connection):
+    # Хэши данных, по которым последний раз строились графики прогресса
+    connection.execute('''
+                       CREATE TABLE IF NOT EXISTS render_cache (
+                                                           name   TEXT PRIMARY KEY,
+                                                           digest TEXT
+                       )
+                       ''')
+
+
+def _migration_5(connection):
+    # Каталог заданий рабочей тетради (см. tests/catalog.py) и время изменения просканированных папок
+    connection.execute('''
+                       CREATE TABLE IF NOT EXISTS catalog_dirs (
+                                                           path     TEXT PRIMARY KEY,
+                                                           mtime_ns INTEGER
+                       )
+                       ''')
+    connection.execute('''
+                       CREATE TABLE IF NOT EXISTS catalog_tasks (
+                                                           task_type   INTEGER,
+                                                           task_number INTEGER,
+                                                           task_dir    TEXT,
+                                                           status      TEXT,
+                                                           script      TEXT,
+                                                           attachments TEXT,
+                                                           answer_hash TEXT,
+                                                           PRIMARY KEY (task_type, task_number)
+                       )
+                       ''')
+
+
+def _migration_6(connection):
+    # Замеры длительности этапов (см. tests/trace.py)
+    connection.execute('''
+                       CREATE TABLE IF NOT EXISTS trace (
+                                                           operation   TEXT,
+                                                           stage       TEXT,
+                                                           seconds     REAL,
+                                                           recorded_at REAL
+                       )
+                       ''')
+    connection.execute('CREATE INDEX IF NOT EXISTS trace_stage ON trace (operation, stage)')
+
+
+def _migration_7(connection):
+    # Свернутая история: попытки старше окна хранения, агрегированные по неделям или месяцам
+    connection.execute('''
+                       CREATE TABLE IF NOT EXISTS progress_rollup (
+                                                           period       TEXT,
+                                                           period_start TEXT,
+                                                           task_type    INTEGER,
+                                                           task_number  BIGINT,
+                                                           attempts     INTEGER,
+                                                           correct      INTEGER,
+                                                           PRIMARY KEY (period, period_start, task_type, task_number)
+                       )
+                       ''')
+    connection.execute('CREATE INDEX IF NOT EXISTS progress_rollup_task ON progress_rollup (task_type, task_number)')
+
+
+def _migration_8(connection):
+    # Потребление ресурсов скриптом решения на момент проверки (NULL, если не замерялось):
+    # время с запуска интерпретатора, процессорное время и пиковый RSS
+    for column in USAGE_COLUMNS:
+        connection.execute(f'ALTER TABLE test ADD COLUMN {column} REAL')
+
+
+def _migration_9(connection):
+    """
+    Каталог заданий ключуется папкой и номером в имени файла, а не аргументами result_register:
+    задания из разных папок с одинаковой регистрацией больше не вытесняют друг друга.
+    Таблица — кэш файловой системы, поэтому она пересоздается, а папки будут пересканированы.
+    """
+    connection.execute('DROP TABLE IF EXISTS catalog_tasks')
+    connection.execute('''
+                       CREATE TABLE catalog_tasks (
+                                                           task_type   INTEGER,
+                                                           task_number INTEGER,
+                                                           task_dir    TEXT,
+                                                           status      TEXT,
+                                                           script      TEXT,
+                                                           attachments TEXT,
+                                                           answer_hash TEXT,
+                                                           file_number INTEGER,
+                                                           PRIMARY KEY (task_dir, file_number)
+                       )
+                       ''')
+    connection.execute('CREATE INDEX IF NOT EXISTS catalog_tasks_task ON catalog_tasks (task_type, task_number)')
+    connection.execute('DELETE FROM catalog_dirs')
+
+
+MIGRATIONS = [
+    (1, _migration_1),
+    (2, _migration_2),
+    (3, _migration_3),
+    (4, _migration_4),
+    (5, _migration_5),
+    (6, _migration_6),
+    (7, _migration_7),
+    (8, _migration_8),
+    (9, _migration_9),
+]
+
+
+def migrate(connection):
+    """Применяет к БД все миграции, которые еще не были применены."""
+    if connection.execute('PRAGMA user_version').fetchone()[0] >= MIGRATIONS[-1][0]:
+        return
+    connection.execute('BEGIN IMMEDIATE')
+    try:
+        # Перечитываем версию под блокировкой: миграцию мог успеть выполнить другой процесс
+        version = connection.execute('PRAGMA user_version').fetchone()[0]
+        for number, migration in MIGRATIONS:
+            if number > version:
+                migration(connection)
+                connection.execute(f'PRAGMA user_version = {number}')
+        connection.execute('COMMIT')
+    except Exception:
+        connection.execute('ROLLBACK')
+        raise
+
+
+# --- Соединение ---
+# Одно соединение на процесс: открывается при первом обращении и переиспользуется.
+# После fork дочерний процесс открывает собственное соединение.
+
+_connection = None
+_connection_key = None
+_connection_lock = threading.RLock()
+
+
+def connect(path=None):
+    """Открывает новое соединение с БД результатов (WAL, ожидание блокировок) и применяет миграции."""
+    path = path or db_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Транзакциями управляем явно (см. transaction), поэтому isolation_level=None
+    connection = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+    connection.execute('PRAGMA journal_mode = WAL')
+    connection.execute('PRAGMA synchronous = NORMAL')
+    migrate(connection)
+    return connection
+
+
+def get_connection():
+    """Возвращает соединение текущего процесса, открывая его при первом обращении."""
+    global _connection, _connection_key
+    key = (os.getpid(), db_path())
+    with _connection_lock:
+        if _connection is None or _connection_key != key:
+            _connection = connect(key[1])
+            _connection_key = key
+        return _connection
+
+
+def checkpoint():
+    """
+    Переносит журнал WAL в основной файл БД и обнуляет result.db-wal. result.db отслеживается Git,
+    а -wal и -shm — нет, поэтому перед коммитом данные должны быть в основном файле.
+    """
+    if not os.path.exists(db_path()):
+        return
+    with _connection_lock:
+        get_connection().execute('PRAGMA wal_checkpoint(TRUNCATE)')
+
+
+def close_connection():
+    """Закрывает соединение текущего процесса (например, перед удалением файла БД)."""
+    global _connection, _connection_key
+    with _connection_lock:
+        if _connection is not None and _connection_key[0] == os.getpid():
+            _connection.close()
+        _connection = None
+        _connection_key = None
+
+
+# Закрытие последнего соединения переносит WAL в result.db: после выхода скрипта задания
+# основной файл БД актуален и для коммита вручную
+atexit.register(close_connection)
+
+
+@contextmanager
+def transaction():
+    """Выполняет блок в одной пишущей транзакции: COMMIT при успехе, ROLLBACK при исключении."""
+    with _connection_lock:
+        connection = get_connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+
+# --- Операции с результатами ---
+
+INSERT_RESULT_SQL = f'''INSERT INTO test (date_time, task_number, task_type, result, {", ".join(USAGE_COLUMNS)})
+                         VALUES (?, ?, ?, ?, ?, ?, ?)'''
+
+def add_result(date_time, task_number, task_type, result, usage=None):
+    """usage — (wall_seconds, cpu_seconds, peak_rss_mb) скрипта решения или None, если не замерялось."""
+    with transaction() as connection:
+        cursor = connection.cursor()
+        # Проверяем, был ли хоть раз правильный результат (в том числе в свернутой истории)
+        cursor.execute(SOLVED_SQL, (task_type, task_number, task_type, task_number))
+        if cursor.fetchone():
+            return  # Если был хоть раз правильный результат, то не добавляем
+
+        # В остальных случаях добавляем новую запись и обновляем сводные таблицы в той же транзакции
+        cursor.execute(INSERT_RESULT_SQL, (date_time, task_number, task_type, result) + tuple(usage or (None,) * 3))
+        register_progress(cursor, date_time, task_number, task_type, result)
+
+
+def add_results(rows):
+    """
+    Записывает несколько результатов (date_time, task_number, task_type, result[, usage]) одной транзакцией
+    с теми же правилами, что и add_result. Возвращает количество добавленных записей.
+    """
+    added = 0
+    with transaction() as connection:
+        cursor = connection.cursor()
+        for date_time, task_number, task_type, result, *usage in rows:
+            cursor.execute(SOLVED_SQL, (task_type, task_number, task_type, task_number))
+            if cursor.fetchone():
+                continue
+            usage = tuple(usage[0]) if usage and usage[0] else (None,) * 3
+            cursor.execute(INSERT_RESULT_SQL, (date_time, task_number, task_type, result) + usage)
+            register_progress(cursor, date_time, task_number, task_type, result)
+            added += 1
+    return added
+
+
+def update_result(date_time, task_number, task_type, result):
+    with transaction() as connection:
+        connection.execute('UPDATE test SET date_time = ?, result = ? WHERE task_type = ? AND task_number = ?',
+                           (date_time, result, task_type, task_number))
+        # Изменение задним числом — сводные таблицы проще пересчитать целиком
+        rebuild_progress_tables(connection)
+
+
+def get_result(task_number, task_type):
+    with _connection_lock:
+        cursor = get_connection().cursor()
+        cursor.execute('SELECT * FROM test WHERE task_number = ? AND task_type = ?',
+                       (task_number, task_type))
+        return cursor.fetchone()
+
+
+def get_last_result(task_number, task_type):
+    """Результат последней записанной попытки задания (0/1) или None, если попыток нет."""
+    with _connection_lock:
+        row = get_connection().execute('SELECT result FROM test WHERE task_type = ? AND task_number = ? '
+                                       'ORDER BY rowid DESC LIMIT 1', (task_type, task_number)).fetchone()
+    return row[0] if row else None
+
+
+def get_results():
+    with _connection_lock:
+        cursor = get_connection().cursor()
+        cursor.execute('SELECT * FROM test')
+        return cursor.fetchall()
+
+
+def get_progress_daily():
+    """Возвращает строки (day, task_type, task_number, attempts, correct) из сводной таблицы."""
+    with _connection_lock:
+        cursor = get_connection().cursor()
+        cursor.execute('SELECT day, task_type, task_number, attempts, correct FROM progress_daily')
+        return cursor.fetchall()
+
+
+def get_common_progress_stats():
+    """
+    Возвращает два словаря:
+    - type -> task_number -> (верных, попыток) за последние 5 дат типа;
+    - type -> количество когда-либо решенных заданий.
+    """
+    recent = defaultdict(dict)
+    with _connection_lock:
+        cursor = get_connection().cursor()
+        cursor.execute('''SELECT d.task_type, d.task_number, SUM(d.correct), SUM(d.attempts)
+                          FROM progress_daily d
+                          JOIN progress_recent_dates r ON r.task_type = d.task_type AND r.day = d.day
+                          GROUP BY d.task_type, d.task_number''')
+        for task_type, task_number, correct, attempts in cursor.fetchall():
+            recent[task_type][task_number] = (correct, attempts)
+        cursor.execute('SELECT task_type, COUNT(*) FROM progress_solved GROUP BY task_type')
+        solved = dict(cursor.fetchall())
+    return recent, solved
+
+
+def get_solution_usage():
+    """
+    Возвращает строки (task_type, task_number, date_time, wall_seconds, cpu_seconds, peak_rss_mb)
+    верных попыток, для которых замерено потребление ресурсов.
+    """
+    with _connection_lock:
+        cursor = get_connection().cursor()
+        cursor.execute(f'''SELECT task_type, task_number, date_time, {", ".join(USAGE_COLUMNS)}
+                           FROM test
+                           WHERE result = 1 AND ({" OR ".join(f"{c} IS NOT NULL" for c in USAGE_COLUMNS)})''')
+        return cursor.fetchall()
+
+
+# --- Окно хранения и свертка истории ---
+
+# Попытки за последние HISTORY_WINDOW_DAYS дней хранятся и показываются по дням,
+# более старые можно свернуть в итоги по неделям или месяцам (см. tests/history.py)
+HISTORY_WINDOW_DAYS = 30
+
+# Начало периода свертки для даты day
+PERIOD_START_SQL = {
+    'week': "date(day, 'weekday 0', '-6 days')",
+    'month': "date(day, 'start of month')",
+}
+
+
+def history_cutoff(window_days=None):
+    """Первая дата окна хранения 'YYYY-MM-DD'. Окно задается аргументом или переменной EGE_HISTORY_DAYS."""
+    if window_days is None:
+        window_days = int(os.environ.get('EGE_HISTORY_DAYS') or HISTORY_WINDOW_DAYS)
+    return (date.today() - timedelta(days=window_days)).isoformat()
+
+
+def compact_history(window_days=None, period='week'):
+    """
+    Сворачивает попытки старше окна хранения в progress_rollup (по неделям или месяцам) и удаляет их
+    из test и progress_daily. Даты, входящие в последние 5 дат своего типа, не сворачиваются —
+    по ним строится общий график. Возвращает количество свернутых попыток.
+    """
+    start_sql = PERIOD_START_SQL[period]
+    cutoff = history_cutoff(window_days)
+    with transaction() as connection:
+        connection.execute('DROP TABLE IF EXISTS temp.compact')
+        connection.execute('''CREATE TEMP TABLE compact AS
+                              SELECT t.id, t.task_type, t.task_number, t.day, t.r
+                              FROM (
+                                  SELECT rowid AS id,
+                                         CAST(task_type AS INTEGER) AS task_type,
+                                         CAST(task_number AS INTEGER) AS task_number,
+                                         ''' + DAY_SQL + ''' AS day,
+                                         CASE WHEN CAST(result AS INTEGER) = 1 THEN 1 ELSE 0 END AS r
+                                  FROM test
+                              ) t
+                              WHERE t.day < ?
+                                AND NOT EXISTS (SELECT 1 FROM progress_recent_dates p
+                                                WHERE p.task_type = t.task_type AND p.day = t.day)''', (cutoff,))
+        connection.execute('''INSERT INTO progress_rollup (period, period_start, task_type, task_number, attempts, correct)
+                              SELECT ?, ''' + start_sql + ''' AS start, task_type, task_number, COUNT(*), SUM(r)
+                              FROM temp.compact
+                              WHERE true
+                              GROUP BY start, task_type, task_number
+                              ON CONFLICT (period, period_start, task_type, task_number)
+                              DO UPDATE SET attempts = attempts + excluded.attempts,
+                                            correct = correct + excluded.correct''', (period,))
+        compacted = connection.execute('DELETE FROM test WHERE rowid IN (SELECT id FROM temp.compact)').rowcount
+        connection.execute('''DELETE FROM progress_daily
+                              WHERE (task_type, day) IN (SELECT DISTINCT task_type, day FROM temp.compact)''')
+        connection.execute('DROP TABLE temp.compact')
+    return compacted
+
+
+def get_rollup_totals():
+    """Возвращает {task_type: (верных, попыток)} по свернутой истории."""
+    with _connection_lock:
+        rows = get_connection().execute('''SELECT task_type, SUM(correct), SUM(attempts)
+                                           FROM progress_rollup GROUP BY task_type''').fetchall()
+    return {task_type: (correct, attempts) for task_type, correct, attempts in rows}
+
+
+def get_render_digest(name):
+    """Возвращает хэш данных, по которым график name был построен в последний раз (или None)."""
+    with _connection_lock:
+        row = get_connection().execute('SELECT digest FROM render_cache WHERE name = ?', (name,)).fetchone()
+    return row[0] if row else None
+
+
+def set_render_digest(name, digest):
+    with transaction() as connection:
+        connection.execute('INSERT OR REPLACE INTO render_cache (name, digest) VALUES (?, ?)', (name, digest))
+
+
+def add_trace(rows):
+    """Записывает замеры (operation, stage, seconds, recorded_at) одной транзакцией."""
+    with transaction() as connection:
+        connection.executemany('INSERT INTO trace (operation, stage, seconds, recorded_at) VALUES (?, ?, ?, ?)', rows)
+
+
+def get_trace():
+    """Возвращает все замеры в виде строк (operation, stage, seconds)."""
+    with _connection_lock:
+        return get_connection().execute('SELECT operation, stage, seconds FROM trace').fetchall()
+
+
+def clear_trace():
+    with transaction() as connection:
+        connection.execute('DELETE FROM trace')
@@ -0,0 +1,154 @@
+"""
+Стресс-тест одновременных коммитов.
+
+Во временном репозитории запускается N процессов-«отправителей», каждый делает M коммитов
+своих файлов — как параллельные проверки заданий. Печатаются задержки коммита (p50/p95/max),
+число неудачных вызовов и потерянных коммитов (файлов, которые не попали в HEAD).
+
+Режимы:
+    locked — commit_paths под общей блокировкой git_lock (текущая реализация);
+    legacy — прежние `git add` + `git commit` с повтором через секунду при index.lock.
+
+Запуск из корня репозитория:
+    python -m tests.stress_git
+    python -m tests.stress_git --submitters 16 --commits 20 --mode legacy
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Файлы, которые нужны отправителям во временном репозитории
+PACKAGE_FILES = ('__init__.py', 'git_writer.py', 'stress_git.py')
+
+
+def legacy_commit(root, path, message):
+    """Повторяет прежние git_add_file + git_commit: без блокировки между процессами, 5 попыток при index.lock."""
+    for _ in range(5):
+        result = subprocess.run(['git', 'add', os.path.relpath(path, root)], cwd=root,
+                                capture_output=True, text=True, check=False)
+        if result.returncode == 0:
+            break
+        if "index.lock" not in result.stderr:
+            return False
+        time.sleep(1)
+    else:
+        return False
+    for _ in range(5):
+        result = subprocess.run(['git', 'commit', '-m', message], cwd=root,
+                                capture_output=True, text=True, check=False)
+        if result.returncode == 0 or "nothing to commit" in result.stdout:
+            return True
+        if "index.lock" not in result.stderr:
+            return False
+        time.sleep(1)
+    return False
+
+
+def submit(submitter, commits, mode):
+    """Тело процесса-отправителя: печатает JSON с задержками и числом неудачных коммитов."""
+    from tests.git_writer import repo_root, commit_paths
+
+    root = repo_root()
+    latencies = []
+    failed = 0
+    for i in range(commits):
+        path = os.path.join(root, 'data', f'{submitter}_{i}.txt')
+        with open(path, 'w') as f:
+            f.write(f'{submitter} {i}\n')
+        message = f'submitter {submitter} commit {i}'
+        started = time.perf_counter()
+        if mode == 'legacy':
+            ok = legacy_commit(root, path, message)
+        else:
+            ok, _ = commit_paths(message, [path])
+        latencies.append(time.perf_counter() - started)
+        failed += 0 if ok else 1
+    print(json.dumps({'latencies': latencies, 'failed': failed}))
+
+
+def make_repo():
+    """Создает временный репозиторий с копией нужных модулей tests/."""
+    root = tempfile.mkdtemp(prefix='ege_stress_')
+    os.makedirs(os.path.join(root, 'tests'))
+    os.makedirs(os.path.join(root, 'data'))
+    for name in PACKAGE_FILES:
+        shutil.copy(os.path.join(os.path.dirname(__file__), name), os.path.join(root, 'tests', name))
+    with open(os.path.join(root, '.gitignore'), 'w') as f:
+        f.write('__pycache__/\ntests/git.lock\n')
+
+    def git(*args):
+        subprocess.run(['git', '-c', 'user.name=stress', '-c', 'user.email=stress@example.com'] + list(args),
+                       cwd=root, capture_output=True, check=True)
+    git('init', '-q')
+    git('config', 'user.name', 'stress')
+    git('config', 'user.email', 'stress@example.com')
+    git('add', '-A')
+    git('commit', '-qm', 'init')
+    return root
+
+
+def run(submitters, commits, mode):
+    root = make_repo()
+    try:
+        started = time.perf_counter()
+        processes = [
+            subprocess.Popen([sys.executable, '-m', 'tests.stress_git', '--submit', str(i),
+                              '--commits', str(commits), '--mode', mode],
+                             cwd=root, env=dict(os.environ, PYTHONPATH=root),
+                             stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+            for i in range(submitters)
+        ]
+        latencies, failed = [], 0
+        for process in processes:
+            out, _ = process.communicate()
+            try:
+                report = json.loads(out.strip().splitlines()[-1])
+            except (IndexError, ValueError):
+                failed += commits
+                continue
+            latencies += report['latencies']
+            failed += report['failed']
+        elapsed = time.perf_counter() - started
+
+        tree = subprocess.run(['git', 'ls-tree', '-r', '--name-only', 'HEAD', 'data'], cwd=root,
+                              capture_output=True, text=True, check=True).stdout.split()
+        lost = submitters * commits - len(tree)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    latencies.sort()
+    q = statistics.quantiles(latencies, n=20) if len(latencies) > 1 else latencies * 19
+    print(f"Режим {mode}: {submitters} отправителей × {commits} коммитов за {elapsed:.2f} с")
+    print(f"  задержка коммита, мс: p50 {statistics.median(latencies) * 1000:.1f}, "
+          f"p95 {q[18] * 1000:.1f}, макс {latencies[-1] * 1000:.1f}")
+    print(f"  неудачных вызовов: {failed}, потеряно коммитов: {lost}")
+    return lost
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Стресс-тест одновременных коммитов')
+    parser.add_argument('--submitters', type=int, default=8)
+    parser.add_argument('--commits', type=int, default=10)
+    parser.add_argument('--mode', choices=['locked', 'legacy', 'both'], default='both')
+    parser.add_argument('--submit', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.submit is not None:
+        submit(args.submit, args.commits, args.mode)
+        return 0
+
+    lost = 0
+    for mode in (['legacy', 'locked'] if args.mode == 'both' else [args.mode]):
+        lost = run(args.submitters, args.commits, mode)
+    # Код возврата отражает последний режим: с блокировкой коммиты теряться не должны
+    return 1 if lost else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,228 @@
+"""
+Запуск одного скрипта задания без побочных эффектов result_register.
+
+Скрипт выполняется как __main__, но вызов result_register только сравнивает хэш ответа:
+в БД ничего не пишется, файлы не переименовываются, графики и коммиты не делаются.
+Вывод самого скрипта отбрасывается; в stdout печатается одна строка JSON:
+    {"script": ..., "calls": [{"task_type", "number", "result", "correct"}, ...],
+     "answer": repr(answer) или null, "error": текст ошибки или null, "seconds": время выполнения}
+
+С --memory-mb и --cpu-seconds (только Linux/macOS) процесс ограничивается через setrlimit:
+нехватка памяти или процессорного времени дает в отчете "limit_exceeded": true.
+С --stub-turtle модуль turtle заменяется заглушкой, и скрипты с рисованием (Тема 6)
+выполняются без окна и дисплея.
+
+С --profile (или переменной окружения EGE_PROFILE=1, которую наследуют пакетная проверка
+и режим наблюдения) скрипт выполняется под cProfile и tracemalloc. Рядом со скриптом
+сохраняются `Задание N.prof` (pstats, открывается snakeviz или pstats.Stats) и
+`Задание N.profile.txt` — топ функций по суммарному времени и топ мест выделения памяти.
+
+Используется пакетной проверкой (tests/grader.py); вручную:
+    python -m tests.task_runner "Тема 1/Задания/Задание 1.py"
+    python -m tests.task_runner --memory-mb 1024 --cpu-seconds 10 "Тема 5/пример3.py"
+    python -m tests.task_runner --stub-turtle "Тема 6/Задания/пример1.py"
+    python -m tests.task_runner --profile --profile-top 30 "Тема 5/Задания/Задание 14.py"
+"""
+import argparse
+import ast
+import cProfile
+import hashlib
+import importlib.util
+import io
+import json
+import os
+import pstats
+import runpy
+import signal
+import sys
+import time
+import traceback
+import tracemalloc
+import types
+
+PROFILE_ENV = 'EGE_PROFILE'
+
+
+class CpuLimitExceeded(BaseException):
+    # BaseException: `except Exception` в скрипте задания не должен перехватить остановку
+    pass
+
+
+def _on_cpu_limit(signum, frame):
+    raise CpuLimitExceeded("Превышен лимит процессорного времени")
+
+
+def apply_limits(memory_mb=None, cpu_seconds=None):
+    """
+    Ограничивает текущий процесс: адресное пространство (память) и процессорное время.
+    По мягкому лимиту CPU приходит SIGXCPU — он превращается в исключение, чтобы успеть записать отчет;
+    жесткий лимит на секунду больше завершает процесс, если скрипт застрял в долгом вызове C-кода.
+    """
+    import resource
+
+    if memory_mb:
+        limit = int(memory_mb * 1024 * 1024)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    if cpu_seconds:
+        soft = max(1, int(cpu_seconds))
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, soft + 1))
+        signal.signal(signal.SIGXCPU, _on_cpu_limit)
+
+
+class _TurtleStub:
+    # Любой вызов и любой атрибут возвращают заглушку: Screen().setup(...), t.pen().fd(...) и т. п.
+    def __call__(self, *args, **kwargs):
+        return self
+
+    def __getattr__(self, name):
+        return self
+
+
+def install_turtle_stub():
+    """
+    Подменяет модуль turtle заглушкой, которая ничего не рисует и не ждет закрытия окна.
+    Имена для `from turtle import *` берутся из исходника настоящего модуля без его импорта
+    (tkinter может быть не установлен, а окно без дисплея не создать).
+    """
+    names = []
+    spec = importlib.util.find_spec('turtle')
+    if spec is not None and spec.origin and os.path.isfile(spec.origin):
+        with open(spec.origin, encoding='utf-8') as f:
+            tree = ast.parse(f.read())
+        for node in tree.body:
+            # _tg_classes, _tg_screen_functions, _tg_turtle_functions, _tg_utilities — из них собран __all__
+            if (isinstance(node, ast.Assign) and isinstance(node.value, ast.List)
+                    and any(isinstance(t, ast.Name) and t.id.startswith('_tg_') for t in node.targets)):
+                names.extend(ast.literal_eval(node.value))
+
+    stub = _TurtleStub()
+    module = types.ModuleType('turtle')
+    for name in names:
+        setattr(module, name, stub)
+    module.Terminator = type('Terminator', (Exception,), {})
+    module.__all__ = names + ['Terminator']
+    module.__getattr__ = lambda name: stub
+    sys.modules['turtle'] = module
+
+
+def profile_enabled():
+    return os.environ.get(PROFILE_ENV, '') not in ('', '0')
+
+
+def profile_paths(script_path):
+    """Пути к файлам профиля: имя задания без префикса статуса, чтобы не плодить копии при '+'/'-'."""
+    task_dir, name = os.path.split(script_path)
+    stem = os.path.splitext(name)[0].lstrip('+-')
+    return os.path.join(task_dir, f"{stem}.prof"), os.path.join(task_dir, f"{stem}.profile.txt")
+
+
+def write_profile(script_path, profiler, snapshot, peak, top):
+    """Сохраняет профиль рядом со скриптом и возвращает путь к файлу pstats."""
+    prof_path, text_path = profile_paths(script_path)
+    profiler.dump_stats(prof_path)
+
+    out = io.StringIO()
+    out.write(f"Профиль {os.path.basename(script_path)}\n\n")
+    out.write(f"Топ-{top} функций по суммарному времени:\n")
+    pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(top)
+    # Служебные выделения (сам tracemalloc, импорт модулей, runpy) не относятся к решению
+    snapshot = snapshot.filter_traces([tracemalloc.Filter(False, tracemalloc.__file__),
+                                       tracemalloc.Filter(False, '<frozen *>')])
+    out.write(f"Пик отслеживаемой памяти: {peak / (1024 * 1024):.1f} МБ\n")
+    out.write(f"Топ-{top} мест выделения памяти (живые объекты в конце выполнения):\n")
+    for stat in snapshot.statistics('lineno')[:top]:
+        frame = stat.traceback[0]
+        out.write(f"  {stat.size / 1024:10.1f} КБ  {stat.count:>9} объектов  {frame.filename}:{frame.lineno}\n")
+    with open(text_path, 'w', encoding='utf-8') as f:
+        f.write(out.getvalue())
+    return prof_path
+
+
+def run_script(script_path, profile=False, profile_top=20):
+    """
+    Выполняет скрипт задания в текущем процессе и возвращает словарь с результатом.
+    profile=True — под cProfile и tracemalloc, с сохранением профиля рядом со скриптом (поле profile отчета).
+    """
+    from tests import conftest
+
+    calls = []
+
+    def capture_result(task_type, number, result, right_result):
+        correct = hashlib.md5(str(result).encode()).hexdigest() == right_result
+        calls.append({'task_type': task_type, 'number': number, 'result': str(result), 'correct': correct})
+        return "Верно" if correct else "Неверно"
+
+    # `from tests.conftest import result_register` в конце скрипта получит подмененную функцию
+    conftest.result_register = capture_result
+
+    report = {'script': script_path, 'calls': calls, 'answer': None, 'error': None, 'limit_exceeded': False}
+    sys.argv = [script_path]
+    profiler = None
+    if profile:
+        tracemalloc.start()
+        profiler = cProfile.Profile()
+    started = time.perf_counter()
+    namespace = None
+    try:
+        if profiler:
+            profiler.enable()
+        try:
+            namespace = runpy.run_path(script_path, run_name='__main__')
+        finally:
+            if profiler:
+                profiler.disable()
+        answer = namespace.get('answer', Ellipsis)
+        report['answer'] = None if answer is Ellipsis else repr(answer)
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            report['error'] = f"SystemExit: {e.code}"
+    except BaseException as e:
+        report['error'] = ''.join(traceback.format_exception_only(type(e), e)).strip()
+        report['limit_exceeded'] = isinstance(e, (MemoryError, CpuLimitExceeded))
+    report['seconds'] = time.perf_counter() - started
+
+    if profiler:
+        # Снимок берется, пока глобальные переменные скрипта (namespace) еще живы
+        snapshot = tracemalloc.take_snapshot()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        try:
+            report['profile'] = write_profile(script_path, profiler, snapshot, peak, profile_top)
+        except OSError as e:
+            report['profile'] = None
+            print(f"Ошибка при сохранении профиля: {e}", file=sys.stderr)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Запуск скрипта задания без побочных эффектов')
+    parser.add_argument('script')
+    parser.add_argument('--memory-mb', type=float, help='лимит адресного пространства, МБ')
+    parser.add_argument('--cpu-seconds', type=float, help='лимит процессорного времени, с')
+    parser.add_argument('--stub-turtle', action='store_true', help='заменить turtle заглушкой')
+    parser.add_argument('--profile', action='store_true',
+                        help=f'профилировать время и память (то же, что {PROFILE_ENV}=1)')
+    parser.add_argument('--profile-top', type=int, default=20, help='сколько строк в топах профиля')
+    args = parser.parse_args()
+    script_path = os.path.abspath(args.script)
+    if args.stub_turtle:
+        install_turtle_stub()
+    if (args.memory_mb or args.cpu_seconds) and os.name != 'nt':
+        apply_limits(args.memory_mb, args.cpu_seconds)
+
+    # Отчет пишется в исходный stdout, а все, что печатает скрипт, уходит в никуда
+    report_out = os.fdopen(os.dup(sys.stdout.fileno()), 'w', encoding='utf-8')
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    sys.stdout.flush()
+    os.dup2(devnull, sys.stdout.fileno())
+    os.close(devnull)
+
+    report = run_script(script_path, args.profile or profile_enabled(), args.profile_top)
+    sys.stdout.flush()
+    report_out.write(json.dumps(report, ensure_ascii=False) + '\n')
+    report_out.flush()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
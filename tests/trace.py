@@ -0,0 +1,98 @@
+"""
+Замеры длительности этапов проверки задания.
+
+Включаются переменной окружения EGE_TRACE=1 (наследуется фоновым обработчиком, поэтому
+замеряются и отрисовка графиков, и коммиты). Этапы замеряются монотонными часами
+и сохраняются в таблицу trace в result.db; без EGE_TRACE замеры ничего не пишут.
+
+Отчет по накопленным замерам (p50/p95 по каждому этапу):
+    python -m tests.trace
+    python -m tests.trace --clear
+"""
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+ENV_VAR = 'EGE_TRACE'
+
+# Замеры текущего процесса, еще не записанные в БД: (этап, секунды)
+_pending = []
+
+
+def enabled():
+    return os.environ.get(ENV_VAR, '') not in ('', '0')
+
+
+@contextmanager
+def stage(name):
+    """Замеряет блок как этап name (если замеры включены)."""
+    if not enabled():
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _pending.append((name, time.perf_counter() - started))
+
+
+def record_stage(name, seconds):
+    """Добавляет готовый замер (например, общее время операции)."""
+    if enabled():
+        _pending.append((name, seconds))
+
+
+def flush(operation):
+    """Записывает накопленные этапы операции operation в result.db одной транзакцией."""
+    if not _pending:
+        return
+    from tests.storage import add_trace
+
+    now = time.time()
+    rows = [(operation, name, seconds, now) for name, seconds in _pending]
+    _pending.clear()
+    try:
+        add_trace(rows)
+    except Exception as e:
+        print(f"Ошибка при записи замеров: {e}")
+
+
+def percentile(values, p):
+    """Перцентиль p (0..100) по отсортированному списку, с интерполяцией между соседними значениями."""
+    if len(values) == 1:
+        return values[0]
+    k = (len(values) - 1) * p / 100
+    low = int(k)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (k - low)
+
+
+def print_report():
+    from tests.storage import get_trace
+
+    by_stage = {}
+    for operation, name, seconds in get_trace():
+        by_stage.setdefault((operation, name), []).append(seconds)
+    if not by_stage:
+        print(f"Замеров нет. Включите их переменной окружения {ENV_VAR}=1")
+        return
+
+    print(f"{'операция':<16} {'этап':<32} {'n':>6} {'p50, мс':>9} {'p95, мс':>9} {'макс, мс':>9}")
+    for (operation, name), values in sorted(by_stage.items()):
+        values.sort()
+        print(f"{operation:<16} {name:<32} {len(values):>6} {percentile(values, 50) * 1000:>9.2f} "
+              f"{percentile(values, 95) * 1000:>9.2f} {values[-1] * 1000:>9.2f}")
+
+
+def main():
+    if '--clear' in sys.argv[1:]:
+        from tests.storage import clear_trace
+        clear_trace()
+        print("Замеры удалены")
+        return
+    print_report()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+Отчет о потреблении ресурсов верными решениями.
+
+С каждой попыткой в result.db записываются время скрипта решения с запуска интерпретатора,
+процессорное время и пиковый RSS (см. result_register и пакетную проверку). По каждой теме
+выводятся самые медленные и самые требовательные к памяти верные решения — кандидаты
+на переборные решения, которые не уложатся в ограничения на экзамене.
+
+Учитываются попытки в таблице test: после свертки истории (tests/history.py) старые попытки
+в отчет не попадают.
+
+Запуск из корня репозитория:
+    python -m tests.usage_report
+    python -m tests.usage_report --topic 5 --top 10
+"""
+import argparse
+
+from tests.storage import get_solution_usage
+
+
+def format_value(value, unit):
+    return f"{value:8.2f} {unit}" if value is not None else f"{'-':>8} {unit}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Самые медленные и требовательные к памяти верные решения')
+    parser.add_argument('--topic', type=int, help='только одна тема')
+    parser.add_argument('--top', type=int, default=3, help='сколько решений показать в каждой теме')
+    args = parser.parse_args()
+
+    by_topic = {}
+    for task_type, task_number, date_time, wall, cpu, rss in get_solution_usage():
+        if args.topic is None or task_type == args.topic:
+            by_topic.setdefault(task_type, []).append((task_number, date_time, wall, cpu, rss))
+    if not by_topic:
+        print("Нет верных решений с замерами ресурсов")
+        return
+
+    for task_type, solutions in sorted(by_topic.items()):
+        print(f"Тема {task_type} (решений с замерами: {len(solutions)})")
+        for title, key in (("  самые медленные:", lambda s: s[2]), ("  больше всего памяти:", lambda s: s[4])):
+            ranked = sorted((s for s in solutions if key(s) is not None), key=key, reverse=True)[:args.top]
+            if not ranked:
+                continue
+            print(title)
+            for task_number, date_time, wall, cpu, rss in ranked:
+                print(f"    Задание {task_number:<6} {format_value(wall, 'с')}  CPU {format_value(cpu, 'с')}  "
+                      f"{format_value(rss, 'МБ')}  ({str(date_time)[:10]})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,367 @@
+"""
+Прогретый запуск скриптов заданий.
+
+Обычный запуск `python "Задание N.py"` — новый интерпретатор, который импортирует tests.conftest
+(sqlite3, subprocess, хранилище, очередь обработчика), а часто еще numpy и matplotlib.
+Сервер загружает эти модули один раз и на каждый скрипт делает fork: дочерний процесс получает
+уже импортированные модули и выполняет скрипт как __main__ с настоящим result_register, то есть
+это обычная отправка решения. stdin, stdout и stderr клиента передаются дочернему процессу
+через Unix-сокет, поэтому вывод, input() и Ctrl+C работают как при обычном запуске.
+
+Клиент подключается к серверу; если сервер не запущен, клиент запускает его в фоне, а сам скрипт
+в этот раз выполняет обычным способом. Сервер завершается после --idle секунд без запросов.
+Нужны fork и Unix-сокеты (Linux/macOS); на Windows клиент всегда запускает скрипт обычным способом.
+
+Запуск из корня репозитория:
+    python -m tests.warm_runner "Тема 5/Задания/Задание 14.py"
+    python -m tests.warm_runner -v "Тема 5/Задания/Задание 14.py"   # время выполнения в stderr
+    python -m tests.warm_runner --serve                              # сервер на переднем плане
+    python -m tests.warm_runner --stop
+"""
+import argparse
+import hashlib
+import json
+import os
+import socket
+import sys
+import time
+
+
+def repo_root():
+    return os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+if repo_root() not in sys.path:
+    sys.path.insert(0, repo_root())
+from tests.runtime import runtime_dir, ensure_runtime_dir, trusted_peer, maxrss_mb
+
+# Как у фонового обработчика: путь к репозиторию может не поместиться в имя Unix-сокета.
+# Папка — только для текущего пользователя: сервер выполняет присланные скрипты от его имени
+_RUNTIME_NAME = f"ege-runner-{hashlib.sha1(repo_root().encode()).hexdigest()[:12]}"
+SOCKET_PATH = os.path.join(runtime_dir(), f"{_RUNTIME_NAME}.sock")
+LOCK_PATH = os.path.join(runtime_dir(), f"{_RUNTIME_NAME}.lock")
+
+# Модули, которые сервер импортирует заранее; отсутствующие пропускаются
+PRELOAD = ['tests.conftest', 'numpy', 'numpy.random', 'matplotlib']
+IDLE_TIMEOUT = 1800  # сервер завершается после стольких секунд без запросов
+MAX_REQUEST = 1 << 20
+
+
+def supported():
+    return hasattr(os, 'fork') and hasattr(socket, 'AF_UNIX') and hasattr(socket, 'send_fds')
+
+
+# --- Клиент ---
+
+def request_server(request, fds=()):
+    """
+    Отправляет запрос серверу (с дескрипторами fds) и ждет ответа.
+    Возвращает словарь ответа или None, если сервер не запущен или сокет слушает чужой процесс.
+    """
+    try:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(SOCKET_PATH)
+    except OSError:
+        return None
+    with sock:
+        # Дескрипторы терминала и окружение (с токенами и паролями) отдаем только своему процессу
+        if not trusted_peer(sock, SOCKET_PATH):
+            return None
+        socket.send_fds(sock, [json.dumps(request).encode() + b'\n'], list(fds))
+        reply = b''
+        while not reply.endswith(b'\n'):
+            try:
+                chunk = sock.recv(4096)
+            except KeyboardInterrupt:
+                # Дочерний процесс не в группе терминала: Ctrl+C передаем ему через сервер
+                sock.sendall(b'INT')
+                continue
+            if not chunk:
+                break
+            reply += chunk
+    try:
+        return json.loads(reply)
+    except ValueError:
+        return None
+
+
+def start_server():
+    """Запускает сервер в фоне (если он уже запущен, новый процесс сразу завершится)."""
+    import subprocess
+
+    env = dict(os.environ, PYTHONPATH=repo_root())
+    try:
+        subprocess.Popen([sys.executable, '-m', 'tests.warm_runner', '--serve'], cwd=repo_root(), env=env,
+                         stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                         close_fds=True, start_new_session=True)
+    except OSError:
+        pass
+
+
+def run(script, args, verbose=False):
+    """Выполняет скрипт на сервере и возвращает код возврата; без сервера — заменяет процесс обычным запуском."""
+    started = time.perf_counter()
+    if supported():
+        request = {'script': os.path.abspath(script), 'argv': [script] + args,
+                   'cwd': os.getcwd(), 'env': dict(os.environ)}
+        reply = request_server(request, fds=(0, 1, 2))
+        if reply is not None:
+            if verbose:
+                print(f"[warm_runner] {(time.perf_counter() - started) * 1000:.0f} мс всего, "
+                      f"скрипт {reply['seconds'] * 1000:.0f} мс, CPU {reply['cpu_seconds'] * 1000:.0f} мс, "
+                      f"пиковый RSS {reply['peak_rss_mb']:.1f} МБ", file=sys.stderr)
+            return reply['exit_code']
+        start_server()
+    if verbose:
+        print("[warm_runner] сервер не запущен, обычный запуск", file=sys.stderr)
+    sys.stdout.flush()
+    # Как и сервер, скрипт задания импортирует tests.* — корень репозитория должен быть в PYTHONPATH
+    os.execve(sys.executable, [sys.executable, script] + args, dict(os.environ, PYTHONPATH=repo_root()))
+
+
+# --- Сервер ---
+
+def preload():
+    import gc
+    import importlib
+
+    for name in PRELOAD:
+        try:
+            importlib.import_module(name)
+        except Exception:
+            pass
+    # Объекты загруженных модулей — в постоянное поколение: сборщик мусора в дочернем процессе
+    # их не обходит и не копирует общие с сервером страницы памяти (copy-on-write)
+    gc.freeze()
+
+
+def acquire_server_lock():
+    """
+    Блокировка единственного сервера. Возвращает файл блокировки или None, если сервер уже запущен.
+    OSError — файл блокировки не открывается (нет прав на папку).
+    """
+    import fcntl
+
+    f_lock = open(LOCK_PATH, 'w')
+    try:
+        fcntl.flock(f_lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f_lock.close()
+        return None
+    return f_lock
+
+
+def receive_request(conn):
+    """Читает запрос (JSON до перевода строки) и переданные с ним дескрипторы."""
+    data, fds, _, _ = socket.recv_fds(conn, MAX_REQUEST, 3)
+    while data and not data.endswith(b'\n') and len(data) < MAX_REQUEST:
+        chunk = conn.recv(MAX_REQUEST)
+        if not chunk:
+            break
+        data += chunk
+    return json.loads(data), fds
+
+
+def exec_request(request, fds, inherited):
+    """
+    Выполняется в дочернем процессе после fork: подключает stdin/stdout/stderr клиента,
+    восстанавливает его окружение и выполняет скрипт как __main__. Не возвращается.
+    """
+    import atexit
+    import runpy
+    import signal
+    import traceback
+
+    signal.set_wakeup_fd(-1)
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    for sock in inherited:
+        sock.close()
+    for target, fd in zip((0, 1, 2), fds):
+        os.dup2(fd, target)
+        os.close(fd)
+    sys.stdin = open(0, 'r', closefd=False)
+    sys.stdout = open(1, 'w', buffering=1 if os.isatty(1) else -1, closefd=False)
+    sys.stderr = open(2, 'w', buffering=1, errors='backslashreplace', closefd=False)
+
+    os.chdir(request['cwd'])
+    os.environ.clear()
+    os.environ.update(request['env'])
+    sys.argv = request['argv']
+    sys.path[0] = os.path.dirname(request['script'])
+    # Генератор random переинициализируется при fork сам, numpy — нет
+    # (seed() без аргумента при первом вызове в процессе заметно дольше, чем seed(число))
+    if 'numpy' in sys.modules:
+        sys.modules['numpy'].random.seed(int.from_bytes(os.urandom(4), 'little'))
+
+    code = 0
+    try:
+        runpy.run_path(request['script'], run_name='__main__')
+    except SystemExit as e:
+        if isinstance(e.code, int) or e.code is None:
+            code = e.code or 0
+        else:
+            print(e.code, file=sys.stderr)
+            code = 1
+    except BaseException as e:
+        # Кадры сервера и runpy пропускаем: трассировка — как при обычном запуске скрипта
+        tb = e.__traceback__
+        while tb is not None and tb.tb_frame.f_code.co_filename != request['script']:
+            tb = tb.tb_next
+        traceback.print_exception(type(e), e, tb or e.__traceback__)
+        code = 130 if isinstance(e, KeyboardInterrupt) else 1
+    try:
+        atexit._run_exitfuncs()
+        sys.stdout.flush()
+        sys.stderr.flush()
+    finally:
+        # Не возвращаемся в цикл сервера: дочерний процесс завершается сразу
+        os._exit(code)
+
+
+def serve(idle_timeout=IDLE_TIMEOUT):
+    import select
+    import signal
+
+    if not ensure_runtime_dir():
+        print(f"Папка для сокета недоступна или открыта другим пользователям: {runtime_dir()}")
+        return 1
+    try:
+        f_lock = acquire_server_lock()
+    except OSError as e:
+        # Клиенты без сервера выполняют скрипты обычным запуском
+        print(f"Не удалось открыть файл блокировки сервера: {e}")
+        return 1
+    if f_lock is None:
+        print("Сервер уже запущен")
+        return 0
+    preload()
+
+    if os.path.exists(SOCKET_PATH):
+        os.remove(SOCKET_PATH)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(SOCKET_PATH)
+    listener.listen(16)
+
+    # SIGCHLD будит select через wakeup fd: результат отправляется клиенту сразу по завершении скрипта
+    wakeup_r, wakeup_w = socket.socketpair()
+    wakeup_r.setblocking(False)
+    wakeup_w.setblocking(False)
+    signal.set_wakeup_fd(wakeup_w.fileno())
+    signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+
+    children = {}  # pid -> (соединение с клиентом, время запуска)
+    by_conn = {}   # соединение -> pid
+    last_activity = time.monotonic()
+    print(f"Сервер запущен: {SOCKET_PATH}", flush=True)
+    try:
+        while True:
+            timeout = None
+            if not children:
+                timeout = last_activity + idle_timeout - time.monotonic()
+                if timeout <= 0:
+                    break
+            readable = select.select([listener, wakeup_r] + list(by_conn), [], [], timeout)[0]
+
+            if wakeup_r in readable:
+                try:
+                    while wakeup_r.recv(512):
+                        pass
+                except OSError:
+                    pass
+            # Завершившиеся дочерние процессы: код возврата и потребление ресурсов — клиенту
+            while children:
+                try:
+                    pid, status, usage = os.wait4(-1, os.WNOHANG)
+                except ChildProcessError:
+                    break
+                if pid == 0:
+                    break
+                conn, started = children.pop(pid)
+                by_conn.pop(conn, None)
+                reply = {'exit_code': os.waitstatus_to_exitcode(status), 'seconds': time.monotonic() - started,
+                         'cpu_seconds': usage.ru_utime + usage.ru_stime, 'peak_rss_mb': maxrss_mb(usage)}
+                try:
+                    conn.sendall(json.dumps(reply).encode() + b'\n')
+                except OSError:
+                    pass
+                conn.close()
+                last_activity = time.monotonic()
+
+            # Сигналы от клиентов: Ctrl+C передается скрипту, разрыв соединения — завершает его
+            for conn in [c for c in readable if c in by_conn]:
+                try:
+                    data = conn.recv(64)
+                except OSError:
+                    data = b''
+                pid = by_conn[conn]
+                try:
+                    os.kill(pid, signal.SIGINT if data else signal.SIGKILL)
+                except OSError:
+                    pass
+                if not data:
+                    del by_conn[conn]
+
+            if listener in readable:
+                conn, _ = listener.accept()
+                last_activity = time.monotonic()
+                if not trusted_peer(conn, SOCKET_PATH):
+                    conn.close()
+                    continue
+                try:
+                    request, fds = receive_request(conn)
+                except (OSError, ValueError):
+                    conn.close()
+                    continue
+                if request.get('command') == 'stop':
+                    conn.sendall(json.dumps({'stopped': True}).encode() + b'\n')
+                    conn.close()
+                    break
+                pid = os.fork()
+                if pid == 0:
+                    exec_request(request, fds, [listener, wakeup_r, wakeup_w, conn] + [c for c, _ in children.values()])
+                for fd in fds:
+                    os.close(fd)
+                children[pid] = (conn, time.monotonic())
+                by_conn[conn] = pid
+    finally:
+        signal.set_wakeup_fd(-1)
+        listener.close()
+        try:
+            os.remove(SOCKET_PATH)
+        except OSError:
+            pass
+        for conn, _ in children.values():
+            conn.close()
+        f_lock.close()
+    print("Сервер остановлен")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Прогретый запуск скриптов заданий')
+    parser.add_argument('script', nargs='?')
+    parser.add_argument('args', nargs=argparse.REMAINDER, help='аргументы скрипта')
+    parser.add_argument('-v', '--verbose', action='store_true', help='печатать время выполнения в stderr')
+    parser.add_argument('--serve', action='store_true', help='запустить сервер на переднем плане')
+    parser.add_argument('--idle', type=float, default=IDLE_TIMEOUT,
+                        help='завершить сервер после стольких секунд без запросов')
+    parser.add_argument('--stop', action='store_true', help='остановить сервер')
+    args = parser.parse_args()
+
+    if args.serve:
+        if not supported():
+            print("Сервер требует fork и Unix-сокетов (Linux/macOS)")
+            return 1
+        return serve(args.idle)
+    if args.stop:
+        reply = request_server({'command': 'stop'}) if supported() else None
+        print("Сервер остановлен" if reply else "Сервер не запущен")
+        return 0
+    if not args.script:
+        parser.error("нужен путь к скрипту")
+    return run(args.script, args.args, args.verbose)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""
+Режим наблюдения: перепроверка только измененных скриптов заданий.
+
+Папки `Тема N/Задания` опрашиваются раз в --interval секунд. Для каждого скрипта хранятся
+время изменения и размер; содержимое хэшируется только если они изменились, а запускается
+скрипт только если изменилось содержимое. Серия быстрых сохранений дает один запуск:
+скрипт проверяется, когда файл не менялся --debounce секунд. Одновременно выполняется
+не больше --jobs скриптов, вердикт печатается сразу по завершении. Лимиты памяти и процессорного
+времени — те же, что у пакетной проверки по умолчанию (tests/grader.py).
+
+По умолчанию вердикты только печатаются (каждое сохранение — не попытка);
+с --record они записываются в result.db, как при пакетной проверке.
+
+Запуск из корня репозитория:
+    python -m tests.watch
+    python -m tests.watch --jobs 2 --debounce 1 --record
+"""
+import argparse
+import hashlib
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from tests.catalog import TASK_FILE_RE, task_dirs
+from tests.grader import DEFAULT_MEMORY_MB, run_task
+from tests.storage import repo_root
+
+
+def file_hash(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def scan_scripts():
+    """
+    Возвращает {(папка, номер задания): (путь, mtime_ns, размер)} для всех скриптов заданий.
+    Ключ не зависит от префикса '+'/'-': переименование после проверки не считается изменением.
+    """
+    scripts = {}
+    for _, task_dir in task_dirs():
+        try:
+            entries = list(os.scandir(task_dir))
+        except OSError:
+            continue
+        for entry in entries:
+            match = TASK_FILE_RE.match(entry.name)
+            if not match or match.group(3).lower() != '.py':
+                continue
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            scripts[(task_dir, int(match.group(2)))] = (entry.path, st.st_mtime_ns, st.st_size)
+    return scripts
+
+
+class Watcher:
+    def __init__(self, jobs, timeout, debounce, record):
+        self.pool = ThreadPoolExecutor(max_workers=jobs)
+        self.timeout = timeout
+        self.debounce = debounce
+        self.record = record
+        self.stats = {}    # ключ -> (путь, mtime_ns, размер) при последнем опросе
+        self.hashes = {}   # ключ -> хэш содержимого, с которым скрипт последний раз проверялся
+        self.pending = {}  # ключ -> время последнего замеченного изменения
+        self.running = {}  # ключ -> Future
+        self.runs = 0
+
+    def start(self):
+        # Исходное состояние запоминается без запуска: проверяются только изменения после старта
+        self.stats = scan_scripts()
+        for key, (path, _, _) in self.stats.items():
+            try:
+                self.hashes[key] = file_hash(path)
+            except OSError:
+                pass
+        print(f"Наблюдение за {len(self.stats)} скриптами заданий. Ctrl+C — выход")
+
+    def poll(self):
+        now = time.monotonic()
+        current = scan_scripts()
+        for key, stat in current.items():
+            if self.stats.get(key) != stat:
+                self.pending[key] = now
+        self.stats = current
+
+        for key, changed_at in list(self.pending.items()):
+            if key not in current:
+                del self.pending[key]  # файл удален
+                continue
+            # Ждем, пока файл перестанет меняться, и не запускаем скрипт, пока идет его прошлая проверка
+            if now - changed_at < self.debounce or key in self.running:
+                continue
+            del self.pending[key]
+            path = current[key][0]
+            try:
+                digest = file_hash(path)
+            except OSError:
+                continue
+            if digest == self.hashes.get(key):
+                continue  # изменились только время или имя файла
+            self.hashes[key] = digest
+            self.running[key] = self.pool.submit(run_task, path, self.timeout, True, DEFAULT_MEMORY_MB, self.timeout)
+
+        for key, future in list(self.running.items()):
+            if future.done():
+                del self.running[key]
+                self.report(future.result())
+
+    def report(self, report):
+        self.runs += 1
+        rel = os.path.relpath(report['script'], repo_root())
+        line = f"{datetime.now():%H:%M:%S}  {report['verdict']:<16} {report['wall']:6.2f} с  {rel}"
+        if report['error']:
+            line += f"  {report['error']}"
+        print(line, flush=True)
+        if self.record and report['calls']:
+            from tests.grader import apply_verdicts
+            apply_verdicts([report])
+
+    def close(self):
+        self.pool.shutdown(wait=True, cancel_futures=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Перепроверка измененных скриптов заданий')
+    parser.add_argument('--jobs', type=int, default=2, help='сколько скриптов выполнять одновременно')
+    parser.add_argument('--timeout', type=float, default=60.0, help='секунд на один скрипт')
+    parser.add_argument('--debounce', type=float, default=0.5, help='сколько секунд файл не должен меняться')
+    parser.add_argument('--interval', type=float, default=0.5, help='период опроса папок, с')
+    parser.add_argument('--record', action='store_true', help='записывать вердикты в result.db')
+    args = parser.parse_args()
+
+    watcher = Watcher(args.jobs, args.timeout, args.debounce, args.record)
+    watcher.start()
+    try:
+        while True:
+            watcher.poll()
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+    print(f"Запусков: {watcher.runs}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())